@@ -1,16 +1,26 @@
 """ML service for SitStraight – provides live posture data and stores results."""
 
+import threading
+import time
 from flask import Flask, jsonify, request
 import numpy as np
 from posture_detector import PostureDetector
 from database import DatabaseClient
+from quality import QualityController
+from profiling import current_timings, install_profiling, timed
+from local_transport import start_local_transport
 
 app = Flask(__name__)
+install_profiling(app)
 
 # global detector instance
 detector = PostureDetector()
 db = DatabaseClient()
 
+# MediaPipe graphs are not thread-safe; frames wait here (= queue depth)
+detector_lock = threading.Lock()
+quality = QualityController()
+
 
 # ===========================================
 #   OPTION A — Browser uploads frames
@@ -23,6 +33,55 @@ def root():
     return {"status": "ML service running"}, 200
 
 
+def analyze_frame(frame_bytes, timings=None, source=None):
+    """
+    Decode, analyze and store one encoded frame. `source` identifies the
+    tracking session it belongs to (for time-in-state accounting).
+    Shared by the HTTP route and the local socket transport.
+    Returns (status_code, body_dict).
+    """
+    # Pick quality for this frame based on current load
+    level, settings = quality.begin()
+    # Only lock wait + pose feed the controller: lowering quality cannot
+    # speed up decoding or the MongoDB write
+    detector_seconds = None
+    try:
+        # Decode image
+        import cv2
+
+        with timed(timings, "decode"):
+            np_arr = np.frombuffer(frame_bytes, np.uint8)
+            img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+
+        if img is None:
+            return 400, {"error": "failed to decode frame"}
+
+        # Analyze posture
+        start = time.perf_counter()
+        with timed(timings, "detector_wait"):
+            detector_lock.acquire()
+        try:
+            state, metrics = detector.analyze(
+                img,
+                model_complexity=settings["model_complexity"],
+                max_width=settings["max_width"],
+                timings=timings,
+            )
+        finally:
+            detector_lock.release()
+        detector_seconds = time.perf_counter() - start
+
+        # Save to DB
+        with timed(timings, "db_insert"):
+            db.insert_posture(state, metrics, source=source)
+    finally:
+        quality.end(detector_seconds)
+
+    metrics["quality"] = level
+    metrics["model_complexity"] = settings["model_complexity"]
+    return 200, metrics
+
+
 @app.route("/process", methods=["POST"])
 def process_frame():
     """Accept one frame from frontend, return posture analysis."""
@@ -32,29 +91,22 @@ def process_frame():
     file = request.files["frame"]
     frame_bytes = file.read()
 
-    # Decode image
-    import cv2
-
-    np_arr = np.frombuffer(frame_bytes, np.uint8)
-    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-
-    if img is None:
-        return jsonify({"error": "failed to decode frame"}), 400
-
-    # Analyze posture
-    state, metrics = detector.analyze(img)
-
-    # Save to DB
-    db.insert_posture(state, metrics)
-
-    return jsonify(metrics)
+    # The web app sends its tracking session id; other callers are keyed
+    # by address
+    source = request.headers.get("X-Tracking-Id") or request.remote_addr
+    status, body = analyze_frame(frame_bytes, current_timings(), source)
+    return jsonify(body), status
 
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint."""
-    return jsonify({"status": "healthy", "service": "ml-client"})
+    return jsonify(
+        {"status": "healthy", "service": "ml-client", "quality": quality.snapshot()}
+    )
 
 
 if __name__ == "__main__":
+    # Optional Unix socket for a co-located web app (ML_SOCKET_PATH)
+    start_local_transport(analyze_frame)
     app.run(host="0.0.0.0", port=5002)
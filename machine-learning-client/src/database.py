@@ -5,8 +5,10 @@ Handles storing posture samples.
 
 import os
 import sys
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from pymongo import MongoClient
+from pymongo import MongoClient, WriteConcern
 from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure
 
 
@@ -20,11 +22,15 @@ DEFAULT_LOCAL_URI = "mongodb://127.0.0.1:27017"
 MONGO_URI = os.getenv("MONGO_URI", DEFAULT_DOCKER_URI)
 
 
-def connect_to_mongo(uri):
-    """Connect to MongoDB with retry logic."""
+def connect_to_mongo(uri, exit_on_failure=True, **options):
+    """
+    Connect to MongoDB with retry logic.
+    Exits the process on failure unless `exit_on_failure` is False,
+    in which case None is returned.
+    """
     try:
         print(f"[DB] Attempting connection to: {uri[:50]}...")
-        client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+        client = MongoClient(uri, serverSelectionTimeoutMS=5000, **options)
         client.admin.command("ping")
         print(f"[DB] ✓ Connected successfully!")
         return client
@@ -36,19 +42,100 @@ def connect_to_mongo(uri):
         if uri != DEFAULT_LOCAL_URI:
             print(f"[DB] Trying fallback → {DEFAULT_LOCAL_URI}")
             try:
-                client = MongoClient(DEFAULT_LOCAL_URI, serverSelectionTimeoutMS=3000)
+                client = MongoClient(
+                    DEFAULT_LOCAL_URI, serverSelectionTimeoutMS=3000, **options
+                )
                 client.admin.command("ping")
                 print(f"[DB] Connected → {DEFAULT_LOCAL_URI}")
                 return client
             except (ServerSelectionTimeoutError, ConnectionFailure):
                 pass
         print("[DB] ERROR: Could not connect to MongoDB")
+        if not exit_on_failure:
+            return None
         sys.exit(1)
 
 
-client = connect_to_mongo(MONGO_URI)
-db = client["sitstraight"]
-samples = db["posture_samples"]
+_client = None
+
+
+# Longest gap between two samples still counted as tracked time (seconds)
+MAX_SAMPLE_GAP = 10
+
+# Sources (tracking sessions / cameras) whose last sample time is kept
+MAX_TRACKED_SOURCES = 4096
+
+
+def get_database():
+    """Connect on first use and return the sitstraight database."""
+    global _client  # pylint: disable=global-statement
+    if _client is None:
+        _client = connect_to_mongo(MONGO_URI)
+    return _client["sitstraight"]
+
+
+def get_samples_collection():
+    """Return the posture samples collection."""
+    return get_database()["posture_samples"]
+
+
+def build_posture_doc(posture_state, metrics, timestamp=None):
+    """Build the MongoDB document stored for one posture sample."""
+    return {
+        "timestamp": timestamp or datetime.now(timezone.utc),
+        "state": posture_state,
+        "score": metrics.get("score", 0),
+        "slouch": metrics.get("slouch_raw", 0),
+        "head_tilt": metrics.get("head_tilt", 0),
+        "shoulder_angle": metrics.get("shoulder_angle", 0),
+        "torso_angle": metrics.get("torso_angle", 0),
+    }
+
+
+def daily_stats_update(doc, gap_seconds=0):
+    """
+    Filter + $inc update folding one sample into its day's aggregate in
+    `daily_stats`: count, score sum, a 101-bin score histogram (one bin
+    per integer score) and per-state sample counts / tracked seconds.
+    Histograms of different days merge by adding bins, so long-range
+    percentiles never need the raw samples.
+    """
+    day = doc["timestamp"].astimezone(timezone.utc).strftime("%Y-%m-%d")
+    score = int(round(max(0, min(100, doc["score"] or 0))))
+    state = doc["state"] or "unknown"
+    seconds = min(max(gap_seconds, 0), MAX_SAMPLE_GAP)
+    return {"_id": day}, {
+        "$inc": {
+            "count": 1,
+            "score_sum": score,
+            f"hist.{score}": 1,
+            f"states.{state}": 1,
+            f"state_seconds.{state}": seconds,
+        }
+    }
+
+
+class SampleGaps:
+    """
+    Seconds since the previous sample of the same source, so time in
+    state is credited per tracking session / camera rather than across
+    everything this process handles. Thread-safe; forgets the least
+    recently seen sources beyond `max_sources`.
+    """
+
+    def __init__(self, max_sources=MAX_TRACKED_SOURCES):
+        self.max_sources = max_sources
+        self._last = OrderedDict()
+        self._lock = threading.Lock()
+
+    def gap(self, source, ts):
+        """Record sample time `ts` (epoch seconds) and return the gap."""
+        with self._lock:
+            previous = self._last.pop(source, None)
+            self._last[source] = ts
+            while len(self._last) > self.max_sources:
+                self._last.popitem(last=False)
+        return 0 if previous is None else ts - previous
 
 
 # ============================================================
@@ -60,21 +147,31 @@ class DatabaseClient:
     """Database client for ML posture tracking."""
 
     def __init__(self):
-        self.samples = samples
+        self.samples = get_samples_collection()
+        # Unacknowledged: the histogram update must not add a second
+        # round trip to every frame
+        self.daily_stats = get_database()["daily_stats"].with_options(
+            write_concern=WriteConcern(w=0)
+        )
+        self.gaps = SampleGaps()
 
-    def insert_posture(self, posture_state, metrics):
-        """Insert a posture sample into MongoDB."""
+    def insert_posture(self, posture_state, metrics, source=None):
+        """
+        Insert a posture sample into MongoDB. `source` identifies the
+        tracking session or camera the sample belongs to.
+        """
         try:
-            doc = {
-                "timestamp": datetime.now(timezone.utc),
-                "state": posture_state,
-                "score": metrics.get("score", 0),
-                "slouch": metrics.get("slouch_raw", 0),
-                "head_tilt": metrics.get("head_tilt", 0),
-                "shoulder_angle": metrics.get("shoulder_angle", 0),
-                "torso_angle": metrics.get("torso_angle", 0),
-            }
+            doc = build_posture_doc(posture_state, metrics)
             self.samples.insert_one(doc)
             print(f"[DB] Saved: {posture_state} | score={metrics.get('score', 0)}")
         except Exception as error:
             print(f"[DB ERROR] Failed to save: {error}")
+            return
+
+        # Time since the source's previous sample counts towards this state
+        gap = self.gaps.gap(source, doc["timestamp"].timestamp())
+
+        try:
+            self.daily_stats.update_one(*daily_stats_update(doc, gap), upsert=True)
+        except Exception as error:
+            print(f"[DB ERROR] Failed to update daily stats: {error}")
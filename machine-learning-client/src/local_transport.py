@@ -0,0 +1,203 @@
+"""
+Unix domain socket transport for a co-located web app.
+
+When the web app runs on the same host it can skip HTTP multipart over
+TCP and send encoded frames over a Unix socket. Both sides keep the
+connection open and exchange length-prefixed messages:
+
+    [header length: u32][payload length: u32][header JSON][payload bytes]
+
+Request header:  {"op": "process", "profile": bool, "source": str};
+                 payload = JPEG bytes
+Response header: {"status": int, "body": {...}, "timings": "a=1.0;b=2.0"}
+
+Payloads are read straight into a buffer that is handed to the decoder
+(no multipart parsing, no extra copies). Frames received here still go
+through any armed /admin/profile capture.
+
+The web app sends every frame to this socket, bypassing its ML pool, so
+enable it (docker-compose.socket.yml) only with a single ML client.
+
+NOTE: the web app's local_transport.py implements the client side of the
+same framing; keep the two in sync.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+from profiling import RequestTimings, capture_request
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# Socket shared with the web app (e.g. on a common Docker volume);
+# the transport is disabled when unset
+ML_SOCKET_PATH = os.getenv("ML_SOCKET_PATH", "")
+
+PREFIX = struct.Struct("!II")  # header length, payload length
+MAX_HEADER_BYTES = 64 * 1024
+MAX_PAYLOAD_BYTES = 16 * 1024 * 1024
+
+
+# ============================================================
+# FRAMING
+# ============================================================
+
+
+def recv_exact(sock, size):
+    """
+    Read exactly `size` bytes into a new buffer.
+    Returns None if the peer closed the connection before any byte.
+    """
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = sock.recv_into(view[got:], size - got)
+        if n == 0:
+            if got == 0:
+                return None
+            raise ConnectionError("connection closed mid-message")
+        got += n
+    return buf
+
+
+def recv_message(sock):
+    """Read one message; returns (header_dict, payload) or None on EOF."""
+    prefix = recv_exact(sock, PREFIX.size)
+    if prefix is None:
+        return None
+    header_len, payload_len = PREFIX.unpack(prefix)
+    if header_len > MAX_HEADER_BYTES or payload_len > MAX_PAYLOAD_BYTES:
+        raise ConnectionError("message too large")
+
+    header = json.loads(_recv_part(sock, header_len) or b"{}")
+    payload = _recv_part(sock, payload_len)
+    return header, payload
+
+
+def _recv_part(sock, size):
+    """Like recv_exact, but EOF here is always an error (prefix already read)."""
+    if size == 0:
+        return bytearray()
+    data = recv_exact(sock, size)
+    if data is None:
+        raise ConnectionError("connection closed mid-message")
+    return data
+
+
+def send_message(sock, header, payload=b""):
+    """Write one message; scatter-gather avoids joining the payload."""
+    header_bytes = json.dumps(header).encode()
+    parts = [PREFIX.pack(len(header_bytes), len(payload)), header_bytes]
+    if payload:
+        parts.append(payload)
+
+    total = sum(len(p) for p in parts)
+    sent = sock.sendmsg(parts)
+    if sent < total:
+        # Rare partial write: finish with a plain sendall of the remainder
+        remainder = memoryview(b"".join(parts))[sent:]
+        sock.sendall(remainder)
+
+
+# ============================================================
+# SERVER
+# ============================================================
+
+
+class FrameRequestHandler(socketserver.BaseRequestHandler):
+    """Serves requests on one persistent connection until it closes."""
+
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, ValueError) as error:
+                print(f"[LOCAL] Dropping connection: {error}")
+                return
+            if message is None:
+                return
+
+            header, payload = message
+            if header.get("op") != "process":
+                send_message(self.request, {"status": 400, "body": {"error": "bad op"}})
+                continue
+
+            timings = RequestTimings() if header.get("profile") else None
+            try:
+                with capture_request("/process"):
+                    status, body = self.server.analyze(
+                        payload, timings, header.get("source")
+                    )
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"[LOCAL] Processing failed: {error}")
+                status, body = 500, {"error": "processing failed"}
+
+            send_message(
+                self.request,
+                {
+                    "status": status,
+                    "body": body,
+                    "timings": timings.header() if timings else "",
+                },
+            )
+
+
+class FrameServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, analyze):
+        self.analyze = analyze
+        super().__init__(path, FrameRequestHandler)
+
+
+def _socket_in_use(path):
+    """True if another process is accepting connections on `path`."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def start_local_transport(analyze, path=ML_SOCKET_PATH):
+    """
+    Serve `analyze(frame_bytes, timings, source) -> (status, body)` on a Unix
+    socket in a background thread. Returns the server, or None if disabled.
+    """
+    if not path:
+        return None
+
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            print(f"[LOCAL] {path} is not a socket; local transport disabled")
+            return None
+        # Never take over a socket another ML client is still serving
+        if _socket_in_use(path):
+            print(f"[LOCAL] {path} is in use; local transport disabled")
+            return None
+        # Stale socket left by a previous run; bind() would fail otherwise
+        os.remove(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    try:
+        server = FrameServer(path, analyze)
+    except OSError as error:
+        print(f"[LOCAL] Could not bind {path}: {error}")
+        return None
+    thread = threading.Thread(
+        target=server.serve_forever, name="local-transport", daemon=True
+    )
+    thread.start()
+    print(f"[LOCAL] Frame socket listening on {path}")
+    return server
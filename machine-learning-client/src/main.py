@@ -9,23 +9,42 @@ Steps:
 2. Capture a frame every few seconds
 3. Analyze posture using Mediapipe
 4. Save results to MongoDB
+
+Run with --pipeline to capture, analyze and save on separate threads
+(always using the latest frame), optionally from several sources:
+
+    python src/main.py --pipeline --source 0 --source desk2.mp4
+
+Add --offline to keep samples in a local SQLite file and upload them to
+MongoDB in batches, so the agent keeps running through network outages.
 """
 
+import argparse
 import cv2
 import time
 from posture_detector import PostureDetector
 from database import DatabaseClient
+from pipeline import CapturePipeline, READ_RETRY_DELAY
 
 # Check posture every X seconds (tunable)
 CHECK_INTERVAL = 5
 
 
-def main():
+def run_pipeline(sources, interval, db=None):
+    """Threaded agent: latest-frame grabber → inference → async DB writer."""
+    print(f"[ML] Starting pipelined client for sources: {sources}")
+    pipeline = CapturePipeline(
+        sources, PostureDetector, db or DatabaseClient(), interval
+    )
+    pipeline.run_forever()
+
+
+def main(db=None):
     print("[ML] Starting posture detection client...")
 
     # Initialize posture detector + database client
     detector = PostureDetector()
-    db = DatabaseClient()
+    db = db or DatabaseClient()
 
     # Open webcam (0 = default laptop camera)
     cap = cv2.VideoCapture(0)
@@ -39,8 +58,9 @@ def main():
     while True:
         ret, frame = cap.read()
 
-        # If frame not captured, skip this cycle
+        # If frame not captured, back off instead of spinning
         if not ret:
+            time.sleep(READ_RETRY_DELAY)
             continue
 
         # Analyze posture in current frame
@@ -56,5 +76,46 @@ def main():
         time.sleep(CHECK_INTERVAL)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="SitStraight desk agent")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="run capture, inference and DB writes on separate threads",
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        help="camera index or video file (repeatable, pipeline mode only)",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="store samples locally and upload them to MongoDB in batches",
+    )
+    parser.add_argument("--interval", type=float, default=CHECK_INTERVAL)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+
+    store = uploader = None
+    if args.offline:
+        from offline_store import BatchUploader, OfflineStore
+
+        store = OfflineStore()
+        uploader = BatchUploader(store)
+        uploader.start()
+
+    try:
+        if args.pipeline:
+            run_pipeline(args.source or ["0"], args.interval, store)
+        else:
+            main(store)
+    except KeyboardInterrupt:
+        print("[ML] Stopping client...")
+    finally:
+        if uploader is not None:
+            uploader.stop()
+            store.close()
@@ -0,0 +1,396 @@
+"""
+Offline storage for the desk agent.
+
+Samples are written to a local SQLite file (plus per-minute aggregates)
+so the agent keeps working without MongoDB. A background uploader pushes
+pending rows in batches over a compressed connection, retrying with
+back-off. Every row carries a dedup key used as its MongoDB `_id`, so a
+batch that is re-sent after a timeout is never stored twice.
+
+Daily histogram increments (`daily_stats`) are not idempotent, so each
+sample also has a local `stats_applied` flag that is only set once the
+increment covering it has been acknowledged.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from database import (
+    MONGO_URI,
+    SampleGaps,
+    build_posture_doc,
+    connect_to_mongo,
+    daily_stats_update,
+)
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+OFFLINE_DB_PATH = os.getenv("OFFLINE_DB_PATH", "sitstraight_agent.db")
+
+# Identifies this desk machine in dedup keys and aggregates
+AGENT_ID = os.getenv("AGENT_ID", socket.gethostname())
+
+# Seconds between upload attempts while everything is healthy
+UPLOAD_INTERVAL = float(os.getenv("OFFLINE_UPLOAD_INTERVAL", "60"))
+
+# Rows sent per bulk write
+UPLOAD_BATCH_SIZE = int(os.getenv("OFFLINE_BATCH_SIZE", "500"))
+
+# Upload raw samples as well as minute aggregates (set to 0 to send
+# aggregates only and cut central write load further)
+UPLOAD_SAMPLES = os.getenv("OFFLINE_UPLOAD_SAMPLES", "1") == "1"
+
+# Uploaded samples kept locally for this long (seconds)
+LOCAL_RETENTION = float(os.getenv("OFFLINE_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Longest wait between retries after failures (seconds)
+MAX_BACKOFF = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    dedup_key TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    state TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    stats_applied INTEGER NOT NULL DEFAULT 0,
+    gap REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_samples_pending ON samples (uploaded, ts);
+
+CREATE TABLE IF NOT EXISTS minute_aggregates (
+    minute INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    slouch_count INTEGER NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 1
+);
+"""
+
+
+# ============================================================
+# LOCAL STORE
+# ============================================================
+
+
+class OfflineStore:
+    """
+    Local SQLite store with the same `insert_posture` interface as
+    DatabaseClient, so it can be dropped into the agent loops.
+    """
+
+    def __init__(self, path=OFFLINE_DB_PATH, agent_id=AGENT_ID):
+        self.agent_id = agent_id
+        self.gaps = SampleGaps()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Bring files created by older agent versions up to SCHEMA."""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(samples)")}
+        with self.conn:
+            if "stats_applied" not in columns:
+                self.conn.execute(
+                    "ALTER TABLE samples "
+                    "ADD COLUMN stats_applied INTEGER NOT NULL DEFAULT 0"
+                )
+                # Older versions folded samples into daily_stats on upload
+                self.conn.execute("UPDATE samples SET stats_applied = uploaded")
+            if "gap" not in columns:
+                self.conn.execute(
+                    "ALTER TABLE samples ADD COLUMN gap REAL NOT NULL DEFAULT 0"
+                )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_samples_stats "
+                "ON samples (stats_applied, ts)"
+            )
+
+    def insert_posture(self, posture_state, metrics, source=None):
+        """Append one sample and fold it into its minute aggregate."""
+        ts = metrics.get("timestamp") or time.time()
+        # Seconds since this source's previous sample (time in state)
+        gap = self.gaps.gap(source, ts)
+        key = f"{self.agent_id}-{uuid.uuid4().hex}"
+        minute = int(ts // 60) * 60
+        score = metrics.get("score", 0)
+        slouch = 1 if posture_state == "slouch" else 0
+
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO samples (dedup_key, ts, state, metrics, gap) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, ts, posture_state, json.dumps(metrics), gap),
+            )
+            self.conn.execute(
+                "INSERT INTO minute_aggregates "
+                "(minute, count, score_sum, slouch_count) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(minute) DO UPDATE SET "
+                "count = count + 1, score_sum = score_sum + excluded.score_sum, "
+                "slouch_count = slouch_count + excluded.slouch_count, dirty = 1",
+                (minute, score, slouch),
+            )
+        print(f"[OFFLINE] Stored: {posture_state} | score={score}")
+
+    def pending_samples(self, limit=UPLOAD_BATCH_SIZE):
+        """Oldest samples not yet uploaded, as MongoDB documents."""
+        return [doc for doc, _ in self._sample_docs("uploaded = 0", limit)]
+
+    def pending_stats(self, limit=UPLOAD_BATCH_SIZE):
+        """Oldest samples not yet folded into daily_stats, as (doc, gap)."""
+        return self._sample_docs("stats_applied = 0", limit)
+
+    def _sample_docs(self, where, limit):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT dedup_key, ts, state, metrics, gap FROM samples "
+                f"WHERE {where} ORDER BY ts LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+        docs = []
+        for key, ts, state, metrics, gap in rows:
+            timestamp = datetime.fromtimestamp(ts, timezone.utc)
+            doc = build_posture_doc(state, json.loads(metrics), timestamp)
+            doc["_id"] = key
+            doc["agent_id"] = self.agent_id
+            docs.append((doc, gap))
+        return docs
+
+    def pending_aggregates(self, limit=UPLOAD_BATCH_SIZE):
+        """Minute aggregates changed since their last upload."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT minute, count, score_sum, slouch_count "
+                "FROM minute_aggregates WHERE dirty = 1 ORDER BY minute LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+        return [
+            {
+                "_id": f"{self.agent_id}-{minute}",
+                "agent_id": self.agent_id,
+                "minute": datetime.fromtimestamp(minute, timezone.utc),
+                "count": count,
+                "score_sum": score_sum,
+                "avg_score": round(score_sum / count, 2),
+                "slouch_count": slouch_count,
+            }
+            for minute, count, score_sum, slouch_count in rows
+        ]
+
+    def mark_samples_uploaded(self, keys):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE samples SET uploaded = 1 WHERE dedup_key = ?",
+                [(k,) for k in keys],
+            )
+
+    def mark_stats_applied(self, keys):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE samples SET stats_applied = 1 WHERE dedup_key = ?",
+                [(k,) for k in keys],
+            )
+
+    def mark_aggregates_uploaded(self, aggregates):
+        """Clear the dirty flag unless the minute changed again meanwhile."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE minute_aggregates SET dirty = 0 "
+                "WHERE minute = ? AND count = ?",
+                [(int(a["minute"].timestamp()), a["count"]) for a in aggregates],
+            )
+
+    def prune(self, retention=LOCAL_RETENTION, samples_uploaded=True):
+        """
+        Drop samples and aggregates older than `retention` once MongoDB
+        has them. When raw samples are not uploaded (`samples_uploaded`
+        False), a sample is done once its daily_stats increment and its
+        minute aggregate have been sent.
+        """
+        if samples_uploaded:
+            sent = "uploaded = 1"
+        else:
+            sent = (
+                "NOT EXISTS (SELECT 1 FROM minute_aggregates m "
+                "WHERE m.minute = CAST(samples.ts / 60 AS INTEGER) * 60 "
+                "AND m.dirty = 1)"
+            )
+        cutoff = time.time() - retention
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"DELETE FROM samples WHERE {sent} AND stats_applied = 1 AND ts < ?",
+                (cutoff,),
+            )
+            self.conn.execute(
+                "DELETE FROM minute_aggregates WHERE dirty = 0 AND minute < ?",
+                (cutoff,),
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# ============================================================
+# BATCH UPLOADER
+# ============================================================
+
+
+class BatchUploader(threading.Thread):
+    """Periodically pushes pending local rows to MongoDB."""
+
+    def __init__(
+        self,
+        store,
+        uri=MONGO_URI,
+        interval=UPLOAD_INTERVAL,
+        upload_samples=UPLOAD_SAMPLES,
+    ):
+        super().__init__(name="offline-uploader", daemon=True)
+        self.store = store
+        self.uri = uri
+        self.interval = interval
+        self.upload_samples = upload_samples
+        self.stop_event = threading.Event()
+        self.failures = 0
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            # zlib wire compression shrinks the JSON-like batches considerably
+            client = connect_to_mongo(
+                self.uri, exit_on_failure=False, compressors="zlib"
+            )
+            if client is not None:
+                self._db = client["sitstraight"]
+        return self._db
+
+    def upload_once(self):
+        """Upload everything pending. Returns the number of rows sent."""
+        db = self._connect()
+        if db is None:
+            raise ConnectionError("MongoDB unreachable")
+
+        sent = 0
+        while self.upload_samples:
+            docs = self.store.pending_samples()
+            if not docs:
+                break
+            # $setOnInsert keyed on the dedup key makes re-sends harmless
+            db["posture_samples"].bulk_write(
+                [
+                    UpdateOne({"_id": d["_id"]}, {"$setOnInsert": d}, upsert=True)
+                    for d in docs
+                ],
+                ordered=False,
+            )
+            self.store.mark_samples_uploaded([d["_id"] for d in docs])
+            sent += len(docs)
+            if len(docs) < UPLOAD_BATCH_SIZE:
+                break
+
+        while True:
+            pending = self.store.pending_stats()
+            if not pending:
+                break
+            self._update_daily_stats(db, pending)
+            if len(pending) < UPLOAD_BATCH_SIZE:
+                break
+
+        while True:
+            aggregates = self.store.pending_aggregates()
+            if not aggregates:
+                break
+            db["posture_minutes"].bulk_write(
+                [
+                    UpdateOne({"_id": a["_id"]}, {"$set": a}, upsert=True)
+                    for a in aggregates
+                ],
+                ordered=False,
+            )
+            self.store.mark_aggregates_uploaded(aggregates)
+            sent += len(aggregates)
+            if len(aggregates) < UPLOAD_BATCH_SIZE:
+                break
+
+        self.store.prune(samples_uploaded=self.upload_samples)
+        return sent
+
+    def _update_daily_stats(self, db, pending):
+        """
+        Fold (doc, gap) samples into the daily histograms with one
+        coalesced $inc per day. Samples are flagged as applied only for
+        days whose update was acknowledged; the rest are retried on the
+        next upload.
+        """
+        days = {}
+        for doc, gap in pending:
+            query, update = daily_stats_update(doc, gap)
+            inc, keys = days.setdefault(query["_id"], ({}, []))
+            for field, value in update["$inc"].items():
+                inc[field] = inc.get(field, 0) + value
+            keys.append(doc["_id"])
+
+        groups = list(days.items())
+        try:
+            db["daily_stats"].bulk_write(
+                [
+                    UpdateOne({"_id": day}, {"$inc": inc}, upsert=True)
+                    for day, (inc, _) in groups
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as error:
+            failed = {e["index"] for e in error.details.get("writeErrors", [])}
+            self.store.mark_stats_applied(
+                [
+                    key
+                    for index, (_, (_, keys)) in enumerate(groups)
+                    if index not in failed
+                    for key in keys
+                ]
+            )
+            raise
+        self.store.mark_stats_applied([doc["_id"] for doc, _ in pending])
+
+    def next_delay(self):
+        """Regular interval when healthy, exponential back-off after failures."""
+        if not self.failures:
+            return self.interval
+        return min(MAX_BACKOFF, self.interval * 2 ** min(self.failures, 10))
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                sent = self.upload_once()
+                if sent:
+                    print(f"[OFFLINE] Uploaded {sent} rows")
+                self.failures = 0
+            except (PyMongoError, ConnectionError) as error:
+                self.failures += 1
+                self._db = None
+                print(f"[OFFLINE] Upload failed ({self.failures}): {error}")
+            self.stop_event.wait(self.next_delay())
+
+    def stop(self, timeout=10):
+        """Stop the loop and make a final upload attempt."""
+        self.stop_event.set()
+        self.join(timeout)
+        try:
+            self.upload_once()
+        except (PyMongoError, ConnectionError) as error:
+            print(f"[OFFLINE] Final upload skipped: {error}")
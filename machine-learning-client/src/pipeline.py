@@ -0,0 +1,294 @@
+"""
+Pipelined capture loop for the headless desk agent.
+
+Stages (one set per camera / video source):
+1. Grabber thread   – reads frames continuously, keeps only the latest one
+2. Inference thread – analyzes the latest frame every CHECK_INTERVAL seconds
+3. Writer thread    – drains results to MongoDB (shared by all sources)
+
+Stages are connected by bounded queues so a slow database never
+backs up capture or inference.
+"""
+
+import queue
+import threading
+import time
+import cv2
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# Results waiting for the writer before the oldest is dropped
+WRITE_QUEUE_SIZE = 32
+
+# Back-off after a failed camera read (seconds)
+READ_RETRY_DELAY = 0.5
+
+# How often per-stage timings are printed (seconds)
+REPORT_INTERVAL = 60
+
+
+# ============================================================
+# STAGE TIMINGS
+# ============================================================
+
+
+class StageTimer:
+    """Collects durations per stage and summarizes them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._durations.setdefault(stage, []).append(seconds)
+
+    def summary(self, reset=True):
+        """Return {stage: {count, avg_ms, p95_ms, max_ms}}."""
+        with self._lock:
+            durations = self._durations
+            if reset:
+                self._durations = {}
+
+        report = {}
+        for stage, values in durations.items():
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            report[stage] = {
+                "count": len(values),
+                "avg_ms": round(1000 * sum(values) / len(values), 2),
+                "p95_ms": round(1000 * p95, 2),
+                "max_ms": round(1000 * values[-1], 2),
+            }
+        return report
+
+
+# ============================================================
+# LATEST-FRAME SLOT
+# ============================================================
+
+
+class LatestFrame:
+    """Single-slot buffer: writers overwrite, readers get the newest frame."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+
+    def put(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, after_seq=0, timeout=None):
+        """
+        Wait for a frame newer than `after_seq`.
+        Returns (seq, frame), or (after_seq, None) on timeout.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq, timeout)
+            if self._seq <= after_seq:
+                return after_seq, None
+            return self._seq, self._frame
+
+
+# ============================================================
+# STAGES
+# ============================================================
+
+
+def parse_source(value):
+    """Camera indices are ints ("0" → 0); anything else is a file/URL."""
+    value = str(value)
+    return int(value) if value.isdigit() else value
+
+
+class FrameGrabber(threading.Thread):
+    """Reads one source as fast as it delivers and keeps the newest frame."""
+
+    def __init__(self, source, timer, stop_event):
+        super().__init__(name=f"grabber-{source}", daemon=True)
+        self.source = source
+        self.slot = LatestFrame()
+        self.timer = timer
+        self.stop_event = stop_event
+        self.finished = threading.Event()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"[ERROR] Source {self.source} could not be opened!")
+            self.finished.set()
+            return
+
+        # Video files play at their own frame rate; cameras are paced by hardware
+        is_file = isinstance(self.source, str)
+        fps = cap.get(cv2.CAP_PROP_FPS) if is_file else 0
+        frame_delay = 1.0 / fps if fps and fps > 0 else 0
+
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                self.timer.record("grab", time.perf_counter() - start)
+
+                if not ret:
+                    if is_file:
+                        print(f"[ML] Source {self.source} finished")
+                        break
+                    # Avoid spinning on a camera that stopped delivering
+                    self.stop_event.wait(READ_RETRY_DELAY)
+                    continue
+
+                self.slot.put(frame)
+                if frame_delay:
+                    self.stop_event.wait(frame_delay)
+        finally:
+            cap.release()
+            self.finished.set()
+
+
+class InferenceWorker(threading.Thread):
+    """Analyzes the latest frame of one grabber at a fixed interval."""
+
+    def __init__(self, grabber, detector, results, timer, stop_event, interval):
+        super().__init__(name=f"inference-{grabber.source}", daemon=True)
+        self.grabber = grabber
+        self.detector = detector
+        self.results = results
+        self.timer = timer
+        self.stop_event = stop_event
+        self.interval = interval
+        self.dropped = 0
+
+    def run(self):
+        seq = 0
+        while not self.stop_event.is_set():
+            seq, frame = self.grabber.slot.get(after_seq=seq, timeout=1.0)
+            if frame is None:
+                if self.grabber.finished.is_set():
+                    break
+                continue
+
+            start = time.perf_counter()
+            posture_state, metrics = self.detector.analyze(frame)
+            self.timer.record("inference", time.perf_counter() - start)
+
+            print(
+                f"[POSTURE] {self.grabber.source}: {posture_state} "
+                f"| score={metrics['score']}"
+            )
+            self._enqueue((str(self.grabber.source), posture_state, metrics))
+
+            self.stop_event.wait(self.interval)
+
+    def _enqueue(self, item):
+        """Put a result on the write queue, dropping the oldest if full."""
+        while True:
+            try:
+                self.results.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.results.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class DatabaseWriter(threading.Thread):
+    """Drains analyzed results into MongoDB off the capture path."""
+
+    def __init__(self, db, results, timer, stop_event):
+        super().__init__(name="db-writer", daemon=True)
+        self.db = db
+        self.results = results
+        self.timer = timer
+        self.stop_event = stop_event
+
+    def run(self):
+        while not (self.stop_event.is_set() and self.results.empty()):
+            try:
+                source, posture_state, metrics = self.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            self.db.insert_posture(posture_state, metrics, source=source)
+            self.timer.record("write", time.perf_counter() - start)
+
+
+# ============================================================
+# PIPELINE
+# ============================================================
+
+
+class CapturePipeline:
+    """Wires grabber → inference → writer stages for one or more sources."""
+
+    def __init__(self, sources, detector_factory, db, interval):
+        self.stop_event = threading.Event()
+        self.timer = StageTimer()
+        self.results = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+
+        self.grabbers = [
+            FrameGrabber(parse_source(s), self.timer, self.stop_event) for s in sources
+        ]
+        # MediaPipe graphs are not thread-safe: one detector per source
+        self.workers = [
+            InferenceWorker(
+                g,
+                detector_factory(),
+                self.results,
+                self.timer,
+                self.stop_event,
+                interval,
+            )
+            for g in self.grabbers
+        ]
+        self.writer = DatabaseWriter(db, self.results, self.timer, self.stop_event)
+
+    def start(self):
+        for thread in [self.writer, *self.grabbers, *self.workers]:
+            thread.start()
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        for thread in [*self.grabbers, *self.workers, self.writer]:
+            thread.join(timeout)
+
+    def is_running(self):
+        return any(w.is_alive() for w in self.workers)
+
+    def report(self):
+        """Print and return per-stage timings since the last report."""
+        summary = self.timer.summary()
+        dropped = sum(w.dropped for w in self.workers)
+        for stage, stats in summary.items():
+            print(
+                f"[PIPELINE] {stage}: n={stats['count']} avg={stats['avg_ms']}ms "
+                f"p95={stats['p95_ms']}ms max={stats['max_ms']}ms"
+            )
+        print(f"[PIPELINE] queued={self.results.qsize()} dropped={dropped}")
+        return summary
+
+    def run_forever(self, report_interval=REPORT_INTERVAL):
+        """Run until all sources finish or Ctrl+C, reporting timings periodically."""
+        self.start()
+        next_report = time.monotonic() + report_interval
+        try:
+            while self.is_running():
+                time.sleep(1)
+                if time.monotonic() >= next_report:
+                    self.report()
+                    next_report += report_interval
+        except KeyboardInterrupt:
+            print("[ML] Stopping pipeline...")
+        finally:
+            self.stop()
+            self.report()
@@ -1,6 +1,7 @@
 """Posture detection using MediaPipe Pose."""
 
 import time
+from contextlib import nullcontext
 import cv2
 import numpy as np
 import mediapipe as mp
@@ -9,24 +10,56 @@ import mediapipe as mp
 class PostureDetector:
     """Handles posture analysis using MediaPipe Pose."""
 
-    def __init__(self):
+    def __init__(self, model_complexity=1):
         self.mp_pose = mp.solutions.pose
-        # Use static_image_mode=True for processing independent frames
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=True,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-        )
+        self.model_complexity = model_complexity
+        # One Pose graph per complexity, created on first use
+        self._poses = {}
+        self.pose = self._get_pose(model_complexity)
+
+    def _get_pose(self, model_complexity):
+        if model_complexity not in self._poses:
+            # Use static_image_mode=True for processing independent frames
+            self._poses[model_complexity] = self.mp_pose.Pose(
+                static_image_mode=True,
+                model_complexity=model_complexity,
+                enable_segmentation=False,
+                min_detection_confidence=0.5,
+            )
+        return self._poses[model_complexity]
 
-    def analyze(self, frame):
+    def analyze(self, frame, model_complexity=None, max_width=None, timings=None):
         """
         Analyze posture from a video frame.
+        `model_complexity` and `max_width` override the default quality
+        (lower complexity / a downscaled frame are faster under load).
+        `timings` (profiling.RequestTimings) records the pose/scoring stages.
         Returns: (state, metrics_dict)
         """
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = self.pose.process(rgb)
 
+        def stage(name):
+            return timings.stage(name) if timings is not None else nullcontext()
+
+        if max_width and frame.shape[1] > max_width:
+            scale = max_width / frame.shape[1]
+            frame = cv2.resize(
+                frame,
+                (max_width, int(frame.shape[0] * scale)),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        pose = self._get_pose(
+            self.model_complexity if model_complexity is None else model_complexity
+        )
+        with stage("pose"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            result = pose.process(rgb)
+
+        with stage("scoring"):
+            return self._score(result)
+
+    def _score(self, result):
+        """Turn MediaPipe landmarks into (state, metrics)."""
         if not result.pose_landmarks:
             return "unknown", {
                 "timestamp": time.time(),
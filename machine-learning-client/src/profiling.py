@@ -0,0 +1,398 @@
+"""
+On-demand profiling hooks for the Flask services.
+
+Two tools:
+ - Per-request stage timings: send `X-Profile: 1` and the response gets an
+   `X-Stage-Timings` header such as `decode=1.8;pose=41.2;scoring=0.3`.
+ - Admin capture: `POST /admin/profile` arms cProfile (or tracemalloc)
+   for the next N matching requests or T seconds; `GET /admin/profile`
+   returns the aggregated result as a pstats file or as collapsed stacks
+   (`flamegraph.pl` / speedscope input).
+
+The admin endpoint is disabled unless PROFILE_ADMIN_TOKEN is set, and
+every call must send that token in the `X-Admin-Token` header.
+
+NOTE: the web app has its own copy of this module (separate container).
+The two copies must stay identical apart from this docstring;
+machine-learning-client/tests/test_profiling.py checks that.
+"""
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from flask import Response, g, jsonify, request
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+
+# Hard caps so a forgotten capture cannot run forever
+MAX_PROFILE_REQUESTS = 1000
+MAX_PROFILE_SECONDS = 600
+
+# Deepest call path emitted in collapsed-stack output
+MAX_STACK_DEPTH = 64
+
+
+# ============================================================
+# PER-REQUEST STAGE TIMINGS
+# ============================================================
+
+
+class RequestTimings:
+    """Wall-clock time spent in named stages of one request."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def add(self, name, ms):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def header(self):
+        return ";".join(f"{k}={v:.1f}" for k, v in self.stages.items())
+
+
+def timed(timings, name):
+    """Time a stage into `timings`; no-op when `timings` is None."""
+    return timings.stage(name) if timings is not None else nullcontext()
+
+
+def stage(name):
+    """Time a stage of the current request (no-op unless X-Profile was sent)."""
+    return timed(g.get("request_timings"), name)
+
+
+def current_timings():
+    """RequestTimings of the current request, or None."""
+    return g.get("request_timings")
+
+
+def parse_timings_header(value):
+    """Parse an `X-Stage-Timings` header back into {stage: ms}."""
+    result = {}
+    for part in (value or "").split(";"):
+        name, _, ms = part.partition("=")
+        try:
+            result[name] = float(ms)
+        except ValueError:
+            continue
+    return result
+
+
+# ============================================================
+# CAPTURE SESSION
+# ============================================================
+
+
+class ProfileCapture:
+    """
+    One armed capture. Requests are profiled one at a time (cProfile
+    cannot profile overlapping requests on different threads), so under
+    concurrency a sample of the matching requests is recorded.
+    """
+
+    def __init__(self, max_requests, max_seconds, mode, path_prefix, every):
+        self.max_requests = max_requests
+        self.deadline = time.monotonic() + max_seconds
+        self.mode = mode
+        self.path_prefix = path_prefix
+        self.every = max(1, every)
+        self.seen = 0
+        self.profiled = 0
+        self.started_at = time.time()
+        self.stats = None
+        self.snapshot = None
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._trace_lock = threading.Lock()
+        self._tracing = False
+        self._timer = None
+        if mode == "memory" and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._tracing = True
+            # Stop tracing at the deadline even if no request or GET arrives
+            self._timer = threading.Timer(max_seconds, self.finish_memory)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def done(self):
+        return self.profiled >= self.max_requests or time.monotonic() >= self.deadline
+
+    def should_profile(self, path):
+        """Decide whether this request is sampled; claims the profiler if so."""
+        if self.done:
+            self.finish_memory()
+            return False
+        if not path.startswith(self.path_prefix):
+            return False
+        with self._lock:
+            self.seen += 1
+            if (self.seen - 1) % self.every:
+                return False
+        return self._busy.acquire(blocking=False)
+
+    def record(self, profiler):
+        """Fold one request's profile into the aggregate and release."""
+        try:
+            with self._lock:
+                if profiler is not None:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profiler)
+                    else:
+                        self.stats.add(profiler)
+                self.profiled += 1
+            if self.done:
+                self.finish_memory()
+        finally:
+            self._busy.release()
+
+    def finish_memory(self):
+        """Take the memory snapshot and stop the tracing this capture started."""
+        with self._trace_lock:
+            if not self._tracing:
+                return
+            self._tracing = False
+            self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        self._timer.cancel()
+
+    def close(self):
+        """Stop tracing without a snapshot (capture cleared or replaced)."""
+        with self._trace_lock:
+            if not self._tracing:
+                return
+            self._tracing = False
+            tracemalloc.stop()
+        self._timer.cancel()
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "path_prefix": self.path_prefix,
+            "requests_seen": self.seen,
+            "requests_profiled": self.profiled,
+            "max_requests": self.max_requests,
+            "seconds_left": max(0, round(self.deadline - time.monotonic(), 1)),
+            "done": self.done,
+        }
+
+    # ---------------- output ----------------
+
+    def pstats_bytes(self):
+        with tempfile.NamedTemporaryFile(suffix=".pstats", delete=False) as f:
+            path = f.name
+        try:
+            self.stats.dump_stats(path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def text_report(self, limit=40):
+        out = io.StringIO()
+        pstats.Stats(self.stats, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def collapsed(self):
+        """
+        Collapsed stacks ("a;b;c <microseconds>"). cProfile keeps only
+        caller→callee edges, so each function's own time is attributed to
+        its heaviest caller chain — an approximation of the real stacks.
+        """
+        raw = self.stats.stats  # {func: (cc, nc, tt, ct, callers)}
+
+        def label(func):
+            filename, line, name = func
+            return f"{name} ({os.path.basename(filename)}:{line})"
+
+        lines = []
+        for func, (_, _, tottime, _, callers) in raw.items():
+            if tottime <= 0:
+                continue
+            chain = [func]
+            seen = {func}
+            current = callers
+            while current and len(chain) < MAX_STACK_DEPTH:
+                parent = max(current, key=lambda c: current[c][3])
+                if parent in seen:
+                    break
+                chain.append(parent)
+                seen.add(parent)
+                current = raw.get(parent, (0, 0, 0, 0, {}))[4]
+            stack = ";".join(label(f) for f in reversed(chain))
+            lines.append(f"{stack} {int(tottime * 1e6)}")
+        return "\n".join(sorted(lines)) + "\n"
+
+    def memory_report(self, limit=30):
+        self.finish_memory()
+        if self.snapshot is None and tracemalloc.is_tracing():
+            # Tracing was already on (e.g. PYTHONTRACEMALLOC); leave it running
+            self.snapshot = tracemalloc.take_snapshot()
+        if self.snapshot is None:
+            return "tracemalloc was stopped before a snapshot was taken\n"
+        snapshot = self.snapshot
+        out = io.StringIO()
+        for stat in snapshot.statistics("traceback")[:limit]:
+            out.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format():
+                out.write(f"  {line}\n")
+        return out.getvalue()
+
+
+# ============================================================
+# FLASK WIRING
+# ============================================================
+
+_capture = None
+
+
+def _authorized():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+@contextmanager
+def capture_request(path):
+    """
+    Run a request that bypasses Flask (e.g. one received on the ML
+    client's Unix socket) under the armed capture, if it matches.
+    """
+    capture = _capture
+    if capture is None or not capture.should_profile(path):
+        yield
+        return
+    profiler = cProfile.Profile() if capture.mode == "cpu" else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        capture.record(profiler)
+
+
+def install_profiling(app, default_path="/process"):
+    """Register the X-Profile hooks and the /admin/profile endpoint."""
+
+    @app.before_request
+    def _profile_before():
+        if request.headers.get("X-Profile"):
+            g.request_timings = RequestTimings()
+            g.request_started = time.perf_counter()
+
+        capture = _capture
+        if capture is not None and capture.should_profile(request.path):
+            g.profile_capture = capture
+            if capture.mode == "cpu":
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+    @app.after_request
+    def _profile_after(response):
+        timings = g.get("request_timings")
+        if timings is not None:
+            timings.add("total", (time.perf_counter() - g.request_started) * 1000)
+            response.headers["X-Stage-Timings"] = timings.header()
+        return response
+
+    @app.teardown_request
+    def _profile_teardown(_error=None):
+        capture = g.pop("profile_capture", None)
+        if capture is None:
+            return
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+        capture.record(profiler)
+
+    @app.route("/admin/profile", methods=["POST"])
+    def start_profile():
+        """Arm a capture: JSON {requests, seconds, mode, path, every}."""
+        global _capture  # pylint: disable=global-statement
+        if not _authorized():
+            return jsonify({"error": "not found"}), 404
+
+        body = request.get_json(silent=True) or {}
+        mode = body.get("mode", "cpu")
+        if mode not in ("cpu", "memory"):
+            return jsonify({"error": "mode must be cpu or memory"}), 400
+
+        try:
+            max_requests = min(int(body.get("requests", 50)), MAX_PROFILE_REQUESTS)
+            max_seconds = min(float(body.get("seconds", 60)), MAX_PROFILE_SECONDS)
+            every = int(body.get("every", 1))
+        except (TypeError, ValueError):
+            return jsonify({"error": "requests/seconds/every must be numbers"}), 400
+
+        if _capture is not None:
+            _capture.close()
+        _capture = ProfileCapture(
+            max_requests,
+            max_seconds,
+            mode,
+            body.get("path", default_path),
+            every,
+        )
+        return jsonify(_capture.status()), 202
+
+    @app.route("/admin/profile", methods=["GET"])
+    def get_profile():
+        """Capture status, or the result once done (?format=pstats|collapsed|text)."""
+        if not _authorized():
+            return jsonify({"error": "not found"}), 404
+        capture = _capture
+        if capture is None:
+            return jsonify({"error": "no capture armed"}), 404
+        if not capture.done:
+            return jsonify(capture.status()), 202
+
+        if capture.mode == "memory":
+            return Response(capture.memory_report(), mimetype="text/plain")
+        if capture.stats is None:
+            return jsonify({**capture.status(), "error": "no requests profiled"}), 200
+
+        fmt = request.args.get("format", "pstats")
+        if fmt == "collapsed":
+            return Response(
+                capture.collapsed(),
+                mimetype="text/plain",
+                headers={"Content-Disposition": "attachment; filename=profile.folded"},
+            )
+        if fmt == "text":
+            return Response(capture.text_report(), mimetype="text/plain")
+        return Response(
+            capture.pstats_bytes(),
+            mimetype="application/octet-stream",
+            headers={"Content-Disposition": "attachment; filename=profile.pstats"},
+        )
+
+    @app.route("/admin/profile", methods=["DELETE"])
+    def cancel_profile():
+        global _capture  # pylint: disable=global-statement
+        if not _authorized():
+            return jsonify({"error": "not found"}), 404
+        if _capture is not None:
+            _capture.close()
+        _capture = None
+        return jsonify({"status": "cleared"}), 200
@@ -0,0 +1,110 @@
+"""
+Load-adaptive quality control for the ML service.
+
+Tracks recent detector latencies (waiting for the detector plus pose
+estimation; decoding and MongoDB writes do not depend on quality) and
+how many frames are waiting, and picks a quality level for the next
+frame:
+ - "high": model_complexity=1, full input resolution
+ - "low":  model_complexity=0, input downscaled to LOW_MAX_WIDTH
+
+Quality drops as soon as p95 latency or queue depth crosses its
+threshold, and is only restored after load has stayed low for a while
+(hysteresis), so the level does not flap under borderline load.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+QUALITY_LEVELS = {
+    "high": {"model_complexity": 1, "max_width": None},
+    "low": {"model_complexity": 0, "max_width": 320},
+}
+
+# Degrade when either threshold is crossed
+DEGRADE_P95_MS = float(os.getenv("QUALITY_DEGRADE_P95_MS", "250"))
+DEGRADE_QUEUE_DEPTH = int(os.getenv("QUALITY_DEGRADE_QUEUE_DEPTH", "4"))
+
+# Restore when both are below these for RESTORE_AFTER seconds
+RESTORE_P95_MS = float(os.getenv("QUALITY_RESTORE_P95_MS", "120"))
+RESTORE_QUEUE_DEPTH = int(os.getenv("QUALITY_RESTORE_QUEUE_DEPTH", "1"))
+RESTORE_AFTER = float(os.getenv("QUALITY_RESTORE_AFTER_SECONDS", "10"))
+
+# Number of recent latencies used for p95
+LATENCY_WINDOW = 50
+
+
+class QualityController:
+    """Chooses the detector quality level from recent load."""
+
+    def __init__(self, clock=time.monotonic):
+        self.level = "high"
+        self.in_flight = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._calm_since = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def begin(self):
+        """Register an incoming frame; returns (level, settings) to use."""
+        with self._lock:
+            self.in_flight += 1
+            self._update()
+            return self.level, QUALITY_LEVELS[self.level]
+
+    def end(self, latency_seconds=None):
+        """
+        Register a finished frame and its detector latency (None when the
+        frame never reached the detector, e.g. it failed to decode).
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if latency_seconds is not None:
+                self._latencies.append(latency_seconds * 1000)
+            self._update()
+
+    def p95_ms(self):
+        if not self._latencies:
+            return 0.0
+        values = sorted(self._latencies)
+        return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+    def _update(self):
+        p95 = self.p95_ms()
+        # Frames queued behind the one currently being analyzed
+        depth = max(0, self.in_flight - 1)
+
+        if self.level == "high":
+            if p95 > DEGRADE_P95_MS or depth >= DEGRADE_QUEUE_DEPTH:
+                self.level = "low"
+                self._calm_since = None
+                print(f"[QUALITY] → low (p95={p95:.0f}ms, depth={depth})")
+            return
+
+        if p95 < RESTORE_P95_MS and depth <= RESTORE_QUEUE_DEPTH:
+            now = self._clock()
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= RESTORE_AFTER:
+                self.level = "high"
+                self._calm_since = None
+                # Latencies measured at low quality say nothing about high
+                self._latencies.clear()
+                print(f"[QUALITY] → high (p95={p95:.0f}ms, depth={depth})")
+        else:
+            self._calm_since = None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "level": self.level,
+                "in_flight": self.in_flight,
+                "p95_ms": round(self.p95_ms(), 1),
+            }
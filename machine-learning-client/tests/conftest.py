@@ -0,0 +1,25 @@
+"""Pytest configuration for ML client tests."""
+
+import os
+import sys
+
+import pytest
+
+# Modules in src/ import each other as top-level modules (as in the container)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+class FakeClock:
+    """Callable stand-in for time.monotonic; tests advance `now` by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """A FakeClock starting at 0."""
+    return FakeClock()
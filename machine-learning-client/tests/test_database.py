@@ -32,3 +32,51 @@ def test_insert_posture():
 
         # Verify insert_one was called
         assert db_client.samples.insert_one.called
+
+
+def test_daily_stats_update():
+    """Test the per-day histogram update built for a sample."""
+    from datetime import datetime, timezone
+    from src.database import MAX_SAMPLE_GAP, daily_stats_update
+
+    doc = {
+        "timestamp": datetime(2025, 3, 4, 12, 0, tzinfo=timezone.utc),
+        "score": 72,
+        "state": "neutral",
+    }
+    query, update = daily_stats_update(doc, gap_seconds=60)
+
+    assert query == {"_id": "2025-03-04"}
+    assert update["$inc"]["hist.72"] == 1
+    assert update["$inc"]["states.neutral"] == 1
+    assert update["$inc"]["state_seconds.neutral"] == MAX_SAMPLE_GAP
+
+
+def test_time_in_state_is_tracked_per_source():
+    """Test that interleaved sessions do not steal each other's time."""
+    from src.database import SampleGaps
+
+    gaps = SampleGaps()
+    assert gaps.gap("session-a", 100.0) == 0
+    assert gaps.gap("session-b", 100.2) == 0
+    assert gaps.gap("session-a", 100.35) == pytest.approx(0.35)
+    assert gaps.gap("session-b", 100.55) == pytest.approx(0.35)
+
+
+def test_daily_stats_write_is_unacknowledged():
+    """Test that the histogram update does not wait for MongoDB."""
+    from unittest.mock import MagicMock
+    from pymongo import WriteConcern
+
+    database = MagicMock()
+    with patch("src.database.get_database", return_value=database):
+        from src.database import DatabaseClient
+
+        db_client = DatabaseClient()
+    db_client.samples = Mock()
+    db_client.insert_posture("aligned", {"score": 90}, source="session-a")
+
+    database["daily_stats"].with_options.assert_called_once_with(
+        write_concern=WriteConcern(w=0)
+    )
+    assert db_client.daily_stats.update_one.called
@@ -0,0 +1,98 @@
+"""Tests for the Unix-socket frame transport."""
+
+import socket
+
+# Same module object local_transport imports (src/ is on sys.path)
+import profiling
+from src.local_transport import recv_message, send_message, start_local_transport
+
+
+def fake_analyze(frame_bytes, timings, source=None):
+    if timings is not None:
+        timings.add("decode", 1.5)
+    return 200, {"size": len(frame_bytes), "source": source}
+
+
+def test_round_trip_on_persistent_connection(tmp_path):
+    """Test that several frames share one connection and get results back."""
+    path = str(tmp_path / "ml.sock")
+    server = start_local_transport(fake_analyze, path)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            for size in (10, 50_000):
+                send_message(sock, {"op": "process", "source": "s1"}, b"x" * size)
+                header, payload = recv_message(sock)
+                assert header["status"] == 200
+                assert header["body"] == {"size": size, "source": "s1"}
+                assert header["timings"] == ""
+                assert payload == b""
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_timings_returned_when_profiling(tmp_path):
+    """Test that stage timings come back on the same channel."""
+    path = str(tmp_path / "ml.sock")
+    server = start_local_transport(fake_analyze, path)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            send_message(sock, {"op": "process", "profile": True}, b"frame")
+            header, _ = recv_message(sock)
+            assert header["timings"] == "decode=1.5"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_disabled_without_path():
+    """Test that no server starts when ML_SOCKET_PATH is unset."""
+    assert start_local_transport(fake_analyze, "") is None
+
+
+def test_refuses_to_replace_live_socket(tmp_path):
+    """Test that a second ML client does not steal a socket in use."""
+    path = str(tmp_path / "ml.sock")
+    server = start_local_transport(fake_analyze, path)
+    try:
+        assert start_local_transport(fake_analyze, path) is None
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            send_message(sock, {"op": "process"}, b"still served")
+            assert recv_message(sock)[0]["status"] == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_replaces_stale_socket(tmp_path):
+    """Test that a socket file left by a dead process is reused."""
+    path = str(tmp_path / "ml.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    server = start_local_transport(fake_analyze, path)
+    assert server is not None
+    server.shutdown()
+    server.server_close()
+
+
+def test_socket_frames_reach_admin_capture(tmp_path, monkeypatch):
+    """Test that an armed cProfile capture also sees socket requests."""
+    capture = profiling.ProfileCapture(1, 60, "cpu", "/process", 1)
+    monkeypatch.setattr(profiling, "_capture", capture)
+    path = str(tmp_path / "ml.sock")
+    server = start_local_transport(fake_analyze, path)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            send_message(sock, {"op": "process"}, b"frame")
+            recv_message(sock)
+        assert capture.done
+        assert capture.stats.total_calls > 0
+    finally:
+        server.shutdown()
+        server.server_close()
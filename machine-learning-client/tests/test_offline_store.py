@@ -0,0 +1,146 @@
+"""Tests for offline storage module."""
+
+import sqlite3
+import time
+from collections import defaultdict
+from unittest.mock import MagicMock
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+from src.offline_store import BatchUploader, OfflineStore
+
+
+def make_store(tmp_path):
+    return OfflineStore(path=str(tmp_path / "agent.db"), agent_id="desk-1")
+
+
+def mock_db():
+    """Database whose collections are separate mocks."""
+    return defaultdict(MagicMock)
+
+
+def test_samples_and_minute_aggregates(tmp_path):
+    """Test that samples are stored and folded into minute aggregates."""
+    store = make_store(tmp_path)
+    store.insert_posture("slouch", {"score": 40, "timestamp": 120.0})
+    store.insert_posture("aligned", {"score": 90, "timestamp": 150.0})
+
+    docs = store.pending_samples()
+    assert len(docs) == 2
+    assert all(d["_id"].startswith("desk-1-") for d in docs)
+
+    aggregates = store.pending_aggregates()
+    assert len(aggregates) == 1
+    assert aggregates[0]["count"] == 2
+    assert aggregates[0]["slouch_count"] == 1
+    assert aggregates[0]["avg_score"] == 65
+
+
+def test_upload_marks_rows_and_dedups(tmp_path):
+    """Test that uploaded rows are not sent again."""
+    store = make_store(tmp_path)
+    store.insert_posture("neutral", {"score": 70, "timestamp": 60.0})
+
+    uploader = BatchUploader(store)
+    uploader._db = MagicMock()
+
+    assert uploader.upload_once() == 2
+    ops = uploader._db["posture_samples"].bulk_write.call_args[0][0]
+    assert ops[0]._filter["_id"].startswith("desk-1-")
+
+    assert store.pending_samples() == []
+    assert store.pending_aggregates() == []
+    assert uploader.upload_once() == 0
+
+
+def test_failed_upload_keeps_rows_and_backs_off(tmp_path):
+    """Test that a failed batch stays pending and delays grow."""
+    store = make_store(tmp_path)
+    store.insert_posture("neutral", {"score": 70, "timestamp": 60.0})
+
+    uploader = BatchUploader(store, interval=10)
+    uploader._db = MagicMock()
+    uploader._db["posture_samples"].bulk_write.side_effect = AutoReconnect("down")
+
+    try:
+        uploader.upload_once()
+    except AutoReconnect:
+        uploader.failures += 1
+
+    assert len(store.pending_samples()) == 1
+    assert uploader.next_delay() == 20
+
+
+def test_daily_stats_retried_until_acknowledged(tmp_path):
+    """Test that a failed daily_stats write is retried, not lost."""
+    store = make_store(tmp_path)
+    store.insert_posture("neutral", {"score": 70, "timestamp": 60.0})
+
+    uploader = BatchUploader(store)
+    uploader._db = mock_db()
+    stats = uploader._db["daily_stats"]
+    stats.bulk_write.side_effect = AutoReconnect("down")
+    with pytest.raises(AutoReconnect):
+        uploader.upload_once()
+    assert store.pending_samples() == []
+
+    stats.bulk_write.side_effect = None
+    uploader.upload_once()
+    ops = stats.bulk_write.call_args[0][0]
+    assert ops[0]._doc["$inc"]["count"] == 1
+    assert store.pending_stats() == []
+
+    stats.bulk_write.reset_mock()
+    uploader.upload_once()
+    assert not stats.bulk_write.called
+
+
+def test_partial_daily_stats_failure_retries_failed_days(tmp_path):
+    """Test that only the days whose update failed are sent again."""
+    store = make_store(tmp_path)
+    store.insert_posture("neutral", {"score": 70, "timestamp": 60.0})
+    store.insert_posture("slouch", {"score": 40, "timestamp": 86400.0 + 60})
+
+    uploader = BatchUploader(store)
+    uploader._db = mock_db()
+    stats = uploader._db["daily_stats"]
+    stats.bulk_write.side_effect = BulkWriteError(
+        {"writeErrors": [{"index": 1, "errmsg": "boom"}]}
+    )
+    with pytest.raises(BulkWriteError):
+        uploader.upload_once()
+
+    pending = store.pending_stats()
+    assert [doc["state"] for doc, _ in pending] == ["slouch"]
+
+
+def test_migrates_files_without_stats_flag(tmp_path):
+    """Test that rows uploaded by older versions are not counted again."""
+    path = str(tmp_path / "agent.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        "CREATE TABLE samples (dedup_key TEXT PRIMARY KEY, ts REAL NOT NULL, "
+        "state TEXT NOT NULL, metrics TEXT NOT NULL, "
+        "uploaded INTEGER NOT NULL DEFAULT 0);"
+        "INSERT INTO samples VALUES ('old', 60, 'neutral', '{}', 1);"
+        "INSERT INTO samples VALUES ('new', 61, 'neutral', '{}', 0);"
+    )
+    conn.close()
+
+    store = OfflineStore(path=path, agent_id="desk-1")
+    assert [doc["_id"] for doc, _ in store.pending_stats()] == ["new"]
+
+
+def test_aggregates_only_mode_prunes_old_samples(tmp_path):
+    """Test that samples never uploaded raw are still pruned by age."""
+    store = make_store(tmp_path)
+    old = time.time() - 30 * 24 * 3600
+    store.insert_posture("neutral", {"score": 70, "timestamp": old})
+    store.insert_posture("neutral", {"score": 70, "timestamp": time.time()})
+
+    uploader = BatchUploader(store, upload_samples=False)
+    uploader._db = mock_db()
+    uploader.upload_once()
+
+    assert not uploader._db["posture_samples"].bulk_write.called
+    remaining = store.conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+    assert remaining == 1
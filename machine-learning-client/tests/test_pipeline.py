@@ -0,0 +1,74 @@
+"""Tests for pipelined capture module."""
+
+import queue
+import threading
+from unittest.mock import Mock
+from src.pipeline import (
+    DatabaseWriter,
+    InferenceWorker,
+    LatestFrame,
+    StageTimer,
+    parse_source,
+)
+
+
+def test_latest_frame_keeps_only_newest():
+    """Test that readers always get the most recent frame."""
+    slot = LatestFrame()
+    slot.put("frame-1")
+    slot.put("frame-2")
+
+    seq, frame = slot.get()
+    assert frame == "frame-2"
+
+    # Nothing newer yet → timeout returns no frame
+    assert slot.get(after_seq=seq, timeout=0.01) == (seq, None)
+
+
+def test_stage_timer_summary():
+    """Test that per-stage timings are summarized and reset."""
+    timer = StageTimer()
+    timer.record("inference", 0.010)
+    timer.record("inference", 0.030)
+
+    summary = timer.summary()
+    assert summary["inference"]["count"] == 2
+    assert summary["inference"]["avg_ms"] == 20.0
+    assert summary["inference"]["max_ms"] == 30.0
+    assert timer.summary() == {}
+
+
+def test_parse_source():
+    """Test camera index vs video file parsing."""
+    assert parse_source("0") == 0
+    assert parse_source("desk.mp4") == "desk.mp4"
+
+
+def test_inference_to_writer():
+    """Test that analyzed frames reach the database writer."""
+    stop = threading.Event()
+    timer = StageTimer()
+    results = queue.Queue(maxsize=4)
+
+    grabber = Mock()
+    grabber.source = 0
+    grabber.slot = LatestFrame()
+    grabber.finished = threading.Event()
+
+    detector = Mock()
+    detector.analyze.return_value = ("aligned", {"score": 90})
+    db = Mock()
+
+    worker = InferenceWorker(grabber, detector, results, timer, stop, interval=0)
+    writer = DatabaseWriter(db, results, timer, stop)
+    worker.start()
+    writer.start()
+
+    grabber.slot.put("frame")
+    grabber.finished.set()
+    worker.join(timeout=5)
+    stop.set()
+    writer.join(timeout=5)
+
+    db.insert_posture.assert_called_with("aligned", {"score": 90}, source="0")
+    assert "write" in timer.summary()
@@ -40,3 +40,14 @@ def test_analyze_returns_correct_format():
     assert "state" in metrics
     assert "slouch_raw" in metrics
     assert "timestamp" in metrics
+
+
+def test_analyze_at_low_quality():
+    """Test analyze with lower model complexity and a downscaled frame."""
+    detector = PostureDetector()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    state, metrics = detector.analyze(frame, model_complexity=0, max_width=320)
+
+    assert state == "unknown"
+    assert "score" in metrics
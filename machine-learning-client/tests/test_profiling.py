@@ -0,0 +1,107 @@
+"""Tests for profiling hooks."""
+
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+import pytest
+from flask import Flask, jsonify
+from src import profiling
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Small Flask app with profiling installed and a staged route."""
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "_capture", None)
+
+    app = Flask(__name__)
+    profiling.install_profiling(app)
+
+    @app.route("/process", methods=["POST"])
+    def process():
+        with profiling.stage("decode"):
+            sum(range(1000))
+        return jsonify({"ok": True})
+
+    app.config["TESTING"] = True
+    with app.test_client() as test_client:
+        yield test_client
+
+
+def test_x_profile_adds_stage_timings(client):
+    """Test the per-request X-Profile opt-in."""
+    response = client.post("/process", headers={"X-Profile": "1"})
+    stages = profiling.parse_timings_header(response.headers["X-Stage-Timings"])
+    assert set(stages) == {"decode", "total"}
+
+    response = client.post("/process")
+    assert "X-Stage-Timings" not in response.headers
+
+
+def test_admin_endpoint_requires_token(client):
+    """Test that the admin endpoint is hidden without the token."""
+    assert client.post("/admin/profile").status_code == 404
+    assert client.get("/admin/profile").status_code == 404
+
+
+def test_capture_next_requests(client):
+    """Test arming a capture and downloading pstats / collapsed stacks."""
+    auth = {"X-Admin-Token": "secret"}
+    response = client.post("/admin/profile", json={"requests": 2}, headers=auth)
+    assert response.status_code == 202
+
+    client.post("/process")
+    assert client.get("/admin/profile", headers=auth).status_code == 202
+    client.post("/process")
+
+    response = client.get("/admin/profile", headers=auth)
+    assert response.status_code == 200
+    with tempfile.NamedTemporaryFile(suffix=".pstats") as f:
+        f.write(response.data)
+        f.flush()
+        assert pstats.Stats(f.name).total_calls > 0
+
+    response = client.get("/admin/profile?format=collapsed", headers=auth)
+    assert b"process (test_profiling.py" in response.data
+
+
+def test_memory_capture_stops_tracing_when_cleared(client):
+    """Test that DELETE and re-arming stop tracemalloc."""
+    auth = {"X-Admin-Token": "secret"}
+    client.post("/admin/profile", json={"mode": "memory"}, headers=auth)
+    assert tracemalloc.is_tracing()
+    client.delete("/admin/profile", headers=auth)
+    assert not tracemalloc.is_tracing()
+
+    client.post("/admin/profile", json={"mode": "memory"}, headers=auth)
+    client.post("/admin/profile", json={"mode": "cpu"}, headers=auth)
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_capture_stops_tracing_at_deadline(client):
+    """Test that an expired memory capture stops tracing with no GET."""
+    auth = {"X-Admin-Token": "secret"}
+    client.post("/admin/profile", json={"mode": "memory", "seconds": 0.1}, headers=auth)
+    assert tracemalloc.is_tracing()
+    time.sleep(0.3)
+    assert not tracemalloc.is_tracing()
+
+    response = client.get("/admin/profile", headers=auth)
+    assert b"KiB in" in response.data
+
+
+def _code_without_docstring(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().split('"""', 2)[2]
+
+
+def test_web_copy_in_sync():
+    """Test that the web app's copy of this module has the same code."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    ml_copy = os.path.join(here, "..", "src", "profiling.py")
+    web_copy = os.path.join(here, "..", "..", "web-app", "app", "profiling.py")
+    if not os.path.exists(web_copy):
+        pytest.skip("web app source not available")
+    assert _code_without_docstring(ml_copy) == _code_without_docstring(web_copy)
@@ -0,0 +1,54 @@
+"""Tests for load-adaptive quality control."""
+
+from src.quality import (
+    DEGRADE_P95_MS,
+    DEGRADE_QUEUE_DEPTH,
+    RESTORE_AFTER,
+    QualityController,
+)
+
+
+def test_starts_at_high_quality():
+    """Test that an idle service uses full quality."""
+    controller = QualityController()
+    level, settings = controller.begin()
+    assert level == "high"
+    assert settings["model_complexity"] == 1
+
+
+def test_degrades_on_queue_depth():
+    """Test that a deep queue switches to complexity 0."""
+    controller = QualityController()
+    for _ in range(DEGRADE_QUEUE_DEPTH + 1):
+        level, settings = controller.begin()
+    assert level == "low"
+    assert settings["model_complexity"] == 0
+
+
+def test_degrades_on_latency_and_restores_when_calm(clock):
+    """Test latency-triggered degrade and delayed restore."""
+    controller = QualityController(clock=clock)
+
+    controller.begin()
+    controller.end((DEGRADE_P95_MS + 100) / 1000)
+    assert controller.level == "low"
+
+    # Fast frames at low quality push p95 back down
+    for _ in range(60):
+        controller.begin()
+        controller.end(0.01)
+    assert controller.level == "low"
+
+    clock.now += RESTORE_AFTER
+    controller.begin()
+    controller.end(0.01)
+    assert controller.level == "high"
+
+
+def test_frames_without_detector_time_are_not_recorded():
+    """Test that decode failures free their slot without skewing p95."""
+    controller = QualityController()
+    controller.begin()
+    controller.end(None)
+    assert controller.in_flight == 0
+    assert controller.p95_ms() == 0.0
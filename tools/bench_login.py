@@ -0,0 +1,113 @@
+"""
+bench_login.py
+
+Login throughput benchmark.
+
+Local mode measures what one password check costs (werkzeug's default
+hash, as used by validate_user) and the resulting logins/second per core.
+HTTP mode hammers a running web app's login form from several threads
+and reports accepted, failed and throttled (429) attempts per second.
+
+Examples:
+    python tools/bench_login.py local --rounds 20
+    python tools/bench_login.py http --base-url http://localhost:5000 \\
+        --email loadtest.0@example.com --password Loadtest1 --threads 8
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+
+def bench_local(args):
+    from werkzeug.security import check_password_hash, generate_password_hash
+
+    hashed = generate_password_hash(args.password)
+    timings = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        check_password_hash(hashed, args.password)
+        timings.append(time.perf_counter() - start)
+
+    mean = statistics.mean(timings)
+    print(f"hash method:      {hashed.split('$', 1)[0]}")
+    print(
+        f"check_password:   {1000 * mean:.1f} ms avg, "
+        f"{1000 * max(timings):.1f} ms max"
+    )
+    print(f"max logins/s/core: {1 / mean:.1f}")
+
+
+def bench_http(args):
+    import requests
+
+    counts = {"ok": 0, "failed": 0, "throttled": 0, "errors": 0}
+    latencies = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def worker():
+        http = requests.Session()
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                response = http.post(
+                    f"{args.base_url}/",
+                    data={"username": args.email, "password": args.password},
+                    allow_redirects=False,
+                    timeout=10,
+                )
+                if response.status_code == 302:
+                    outcome = "ok"
+                elif response.status_code == 429:
+                    outcome = "throttled"
+                else:
+                    outcome = "failed"
+            except requests.exceptions.RequestException:
+                outcome = "errors"
+            with lock:
+                counts[outcome] += 1
+                latencies.append(time.perf_counter() - start)
+
+    threads = [
+        threading.Thread(target=worker, daemon=True) for _ in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(15)
+
+    ordered = sorted(latencies) or [0]
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"threads={args.threads} seconds={args.seconds}")
+    for outcome, n in counts.items():
+        print(f"  {outcome:<10} {n:>6}  ({n / args.seconds:.1f}/s)")
+    print(f"  p50 {1000 * ordered[len(ordered) // 2]:.1f} ms, p95 {1000 * p95:.1f} ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SitStraight login benchmark")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    local = sub.add_parser("local", help="time password hash checks in-process")
+    local.add_argument("--rounds", type=int, default=20)
+    local.add_argument("--password", default="Loadtest1")
+
+    http = sub.add_parser("http", help="hammer a running web app's login form")
+    http.add_argument("--base-url", default="http://localhost:5000")
+    http.add_argument("--email", required=True)
+    http.add_argument("--password", required=True)
+    http.add_argument("--threads", type=int, default=8)
+    http.add_argument("--seconds", type=float, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    cli_args = parse_args()
+    if cli_args.mode == "local":
+        bench_local(cli_args)
+    else:
+        bench_http(cli_args)
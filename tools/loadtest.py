@@ -0,0 +1,545 @@
+"""
+loadtest.py
+
+Load generator for SitStraight tracking sessions.
+
+Simulates N concurrent browser sessions: each one logs in through `/`,
+opens `/tracking` and streams JPEG frames to `/process` at the tracking
+page's cadence. Sessions are ramped in steps; every step records
+per-request latency, errors, ML-side load (/api/status) and, optionally,
+MongoDB write throughput, then a capacity report shows where the web
+app, ML service or MongoDB saturate.
+
+Logins are throttled per client IP by the web app. Sessions wait out
+429 responses (Retry-After) and the step clock only starts once every
+session has logged in, so login throttling is reported on its own and
+never counts as lost frames.
+
+Examples:
+    # against docker-compose (creates loadtest users on the fly)
+    python tools/loadtest.py --base-url http://localhost:5000 \\
+        --steps 1,5,10,20 --step-seconds 30 --register
+
+    # replay recorded frames, also watch Mongo
+    python tools/loadtest.py --frames recorded/ --mongo-uri mongodb://localhost:27017
+
+    # local stand-in for the ML service (point ML_CLIENT_URL at it)
+    python tools/loadtest.py stub-ml --port 5002 --delay-ms 80
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# tracking.js sends one frame every 350 ms
+DEFAULT_CADENCE = 0.35
+
+LOADTEST_PASSWORD = "Loadtest1"
+
+# A step is "saturated" when p95 latency exceeds this (ms) ...
+SATURATED_P95_MS = 1000
+# ... or fewer than this share of the offered frames succeed
+SATURATED_SUCCESS_RATIO = 0.9
+
+# Longest a step waits for its sessions to log in (seconds)
+DEFAULT_LOGIN_TIMEOUT = 120
+
+
+# ============================================================
+# FRAMES
+# ============================================================
+
+
+def load_frames(frames_dir, count=20):
+    """Recorded JPEGs from `frames_dir`, or synthetic ones via OpenCV."""
+    if frames_dir:
+        paths = sorted(
+            glob.glob(os.path.join(frames_dir, "*.jpg"))
+            + glob.glob(os.path.join(frames_dir, "*.jpeg"))
+        )
+        if not paths:
+            sys.exit(f"[LOAD] No .jpg files in {frames_dir}")
+        frames = []
+        for path in paths:
+            with open(path, "rb") as f:
+                frames.append(f.read())
+        return frames
+
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        sys.exit("[LOAD] Synthetic frames need opencv-python + numpy (or --frames)")
+
+    frames = []
+    rng = np.random.default_rng(0)
+    for _ in range(count):
+        img = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if ok:
+            frames.append(buf.tobytes())
+    return frames
+
+
+# ============================================================
+# RESULTS
+# ============================================================
+
+
+class StepStats:
+    """Thread-safe collection of request outcomes for one ramp step."""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.qualities = {}
+        self.ml_samples = []
+        self.mongo = None
+        self.logged_in = 0
+        self.login_failures = 0
+        self.login_throttled = 0
+        self.login_wait = 0.0
+        self.login_seconds = 0.0
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record_login(self, ok):
+        with self._lock:
+            if ok:
+                self.logged_in += 1
+            else:
+                self.login_failures += 1
+
+    def record_login_throttle(self, wait):
+        with self._lock:
+            self.login_throttled += 1
+            self.login_wait += wait
+
+    @property
+    def logins_finished(self):
+        return self.logged_in + self.login_failures
+
+    def record(self, latency, status, quality=None):
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if quality:
+                self.qualities[quality] = self.qualities.get(quality, 0) + 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def summary(self, cadence):
+        elapsed = (self.finished or time.time()) - self.started
+        ok = self.statuses.get(200, 0)
+        # Only sessions that got past login were offering frames
+        offered = self.logged_in * elapsed / cadence
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            if not ordered:
+                return 0.0
+            idx = min(len(ordered) - 1, int(len(ordered) * p))
+            return round(1000 * ordered[idx], 1)
+
+        in_flight = [s.get("in_flight", 0) for s in self.ml_samples]
+        return {
+            "sessions": self.sessions,
+            "seconds": round(elapsed, 1),
+            "requests": len(self.latencies) + self.errors,
+            "ok": ok,
+            "throughput_fps": round(ok / elapsed, 2) if elapsed else 0,
+            "offered_fps": round(offered / elapsed, 2) if elapsed else 0,
+            "success_ratio": round(ok / offered, 3) if offered else 0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "statuses": self.statuses,
+            "errors": self.errors,
+            "ml_quality": self.qualities,
+            "ml_in_flight_avg": (
+                round(statistics.mean(in_flight), 2) if in_flight else None
+            ),
+            "mongo": self.mongo,
+            "login": {
+                "ok": self.logged_in,
+                "failed": self.login_failures,
+                "throttled": self.login_throttled,
+                "waited_s": round(self.login_wait, 1),
+                "seconds": round(self.login_seconds, 1),
+            },
+        }
+
+
+# ============================================================
+# SIMULATED BROWSER SESSION
+# ============================================================
+
+
+def post_form(http, url, data, stats, deadline):
+    """POST a login/register form, waiting out 429s until `deadline`."""
+    while True:
+        response = http.post(url, data=data, allow_redirects=False, timeout=10)
+        if response.status_code != 429:
+            return response
+        wait = float(response.headers.get("Retry-After", 1))
+        stats.record_login_throttle(wait)
+        if time.monotonic() + wait > deadline:
+            raise RuntimeError(f"still throttled at --login-timeout ({url})")
+        time.sleep(wait)
+
+
+def login(http, args, email, stats, deadline):
+    """Log in (registering first if asked) and open the tracking page."""
+    base_url, password = args.base_url, args.password
+    if args.register:
+        post_form(
+            http,
+            f"{base_url}/register",
+            {
+                "name": "Load Test",
+                "email": email,
+                "password": password,
+                "password_confirm": password,
+            },
+            stats,
+            deadline,
+        )
+
+    response = post_form(
+        http,
+        f"{base_url}/",
+        {"username": email, "password": password},
+        stats,
+        deadline,
+    )
+    if response.status_code != 302:
+        raise RuntimeError(f"login failed for {email} ({response.status_code})")
+
+    # Visiting /tracking starts a tracking session (ML routing key)
+    http.get(f"{base_url}/tracking", timeout=10)
+
+
+def run_session(index, args, frames, stats, go_event, stop_event):
+    """One simulated tab: log in, then stream frames until stopped."""
+    http = requests.Session()
+    target = args.ml_url or args.base_url
+
+    if not args.ml_url:
+        email = args.user_template.format(i=index)
+        deadline = time.monotonic() + args.login_timeout
+        try:
+            login(http, args, email, stats, deadline)
+        except (requests.exceptions.RequestException, RuntimeError) as error:
+            print(f"[LOAD] session {index}: {error}")
+            stats.record_login(False)
+            return
+    stats.record_login(True)
+
+    # Frames only count once every session has logged in
+    go_event.wait()
+
+    # Spread sessions over the cadence so they do not fire in lockstep
+    stop_event.wait(random.uniform(0, args.cadence))
+    next_send = time.monotonic()
+    while not stop_event.is_set():
+        frame = random.choice(frames)
+        start = time.perf_counter()
+        try:
+            response = http.post(
+                f"{target}/process",
+                files={"frame": ("frame.jpg", frame, "image/jpeg")},
+                timeout=args.timeout,
+            )
+            quality = None
+            if response.status_code == 200:
+                quality = response.json().get("quality")
+            stats.record(time.perf_counter() - start, response.status_code, quality)
+        except requests.exceptions.RequestException:
+            stats.record_error()
+
+        next_send += args.cadence
+        stop_event.wait(max(0.0, next_send - time.monotonic()))
+
+
+# ============================================================
+# SIDE PROBES (ML + MONGO)
+# ============================================================
+
+
+def probe_ml(args, stats, stop_event):
+    """Poll ML health for queue depth / quality while the step runs."""
+    url = f"{args.ml_url}/health" if args.ml_url else f"{args.base_url}/api/status"
+    while not stop_event.is_set():
+        try:
+            body = requests.get(url, timeout=2).json()
+            quality = body.get("quality")
+            if isinstance(quality, dict):
+                stats.ml_samples.append(quality)
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        stop_event.wait(1.0)
+
+
+def mongo_counter(uri):
+    """Return a function counting posture samples since a given time."""
+    from datetime import datetime, timezone
+    from pymongo import MongoClient
+
+    samples = MongoClient(uri, serverSelectionTimeoutMS=3000)["sitstraight"][
+        "posture_samples"
+    ]
+
+    def measure(since):
+        start = time.perf_counter()
+        count = samples.count_documents(
+            {"timestamp": {"$gte": datetime.fromtimestamp(since, timezone.utc)}}
+        )
+        return {
+            "inserted": count,
+            "query_ms": round(1000 * (time.perf_counter() - start), 1),
+        }
+
+    return measure
+
+
+# ============================================================
+# RAMP + REPORT
+# ============================================================
+
+
+def run_step(sessions, args, frames, mongo):
+    stats = StepStats(sessions)
+    go_event = threading.Event()
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(
+            target=run_session,
+            args=(i, args, frames, stats, go_event, stop_event),
+            daemon=True,
+        )
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Log everyone in first; sessions give up at --login-timeout themselves
+    login_started = time.time()
+    while stats.logins_finished < sessions:
+        time.sleep(0.1)
+    stats.login_seconds = time.time() - login_started
+    stats.started = time.time()
+    go_event.set()
+
+    probe = threading.Thread(
+        target=probe_ml, args=(args, stats, stop_event), daemon=True
+    )
+    probe.start()
+    threads.append(probe)
+    time.sleep(args.step_seconds)
+    stop_event.set()
+    for thread in threads:
+        thread.join(args.timeout + 2)
+    stats.finished = time.time()
+
+    if mongo is not None:
+        try:
+            stats.mongo = mongo(stats.started)
+        except Exception as error:  # pylint: disable=broad-except
+            stats.mongo = {"error": str(error)}
+
+    return stats.summary(args.cadence)
+
+
+def diagnose(step):
+    """Best guess at which tier limits this step."""
+    saturated = (
+        step["p95_ms"] > SATURATED_P95_MS
+        or step["success_ratio"] < SATURATED_SUCCESS_RATIO
+    )
+    if not step["login"]["ok"]:
+        return "no session logged in (see login columns)"
+    if not saturated:
+        return "ok"
+
+    mongo = step.get("mongo") or {}
+    if mongo.get("inserted") is not None and mongo["inserted"] < 0.8 * step["ok"]:
+        return "mongo (writes lag behind processed frames)"
+    if mongo.get("query_ms", 0) > 500:
+        return "mongo (slow queries)"
+    if step.get("ml_in_flight_avg") and step["ml_in_flight_avg"] >= 2:
+        return "ml (frames queue at the detector)"
+    if step["ml_quality"].get("low"):
+        return "ml (running at reduced quality)"
+    if step["statuses"].get(429):
+        return "admission limit (429s)"
+    return "web app (ML idle but requests slow)"
+
+
+def print_report(steps):
+    print()
+    print("=" * 78)
+    print("CAPACITY REPORT")
+    print("=" * 78)
+    print(
+        f"{'sessions':>8} {'ok fps':>8} {'offered':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'login 429':>9} "
+        f"{'login fail':>10}  verdict"
+    )
+    for step in steps:
+        failures = step["errors"] + sum(
+            n for code, n in step["statuses"].items() if code != 200
+        )
+        print(
+            f"{step['sessions']:>8} {step['throughput_fps']:>8} "
+            f"{step['offered_fps']:>8} {step['p50_ms']:>8} {step['p95_ms']:>8} "
+            f"{step['p99_ms']:>8} {failures:>7} {step['login']['throttled']:>9} "
+            f"{step['login']['failed']:>10}  {step['verdict']}"
+        )
+
+    healthy = [s for s in steps if s["verdict"] == "ok"]
+    if healthy:
+        print(f"\nSustained: {healthy[-1]['sessions']} concurrent sessions")
+    first_bad = next((s for s in steps if s["verdict"] != "ok"), None)
+    if first_bad:
+        print(f"Saturates at {first_bad['sessions']} sessions: {first_bad['verdict']}")
+
+
+def run_load(args):
+    frames = load_frames(args.frames)
+    mongo = mongo_counter(args.mongo_uri) if args.mongo_uri else None
+
+    steps = []
+    for sessions in args.steps:
+        print(f"[LOAD] {sessions} sessions for {args.step_seconds}s ...")
+        step = run_step(sessions, args, frames, mongo)
+        step["verdict"] = diagnose(step)
+        login = step["login"]
+        print(
+            f"[LOAD]   logins: {login['ok']} ok, {login['failed']} failed, "
+            f"{login['throttled']} throttled in {login['seconds']}s"
+        )
+        print(
+            f"[LOAD]   {step['throughput_fps']} fps, p95={step['p95_ms']}ms "
+            f"→ {step['verdict']}"
+        )
+        steps.append(step)
+
+    print_report(steps)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(steps, f, indent=2)
+        print(f"\nFull results written to {args.json}")
+
+
+# ============================================================
+# STUB ML SERVICE
+# ============================================================
+
+
+def run_stub_ml(args):
+    """Stand-in ML client: fixed result after a configurable delay."""
+    delay = args.delay_ms / 1000
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            self._json({"status": "healthy", "service": "ml-client-stub"})
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            self._json(
+                {
+                    "timestamp": time.time(),
+                    "score": 85,
+                    "state": "aligned",
+                    "slouch_raw": 0.15,
+                    "quality": "stub",
+                }
+            )
+
+        def log_message(self, *_):
+            pass
+
+    print(f"[LOAD] Stub ML client on :{args.port} (delay {args.delay_ms} ms)")
+    ThreadingHTTPServer(("0.0.0.0", args.port), Handler).serve_forever()
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SitStraight load generator")
+    sub = parser.add_subparsers(dest="command")
+
+    stub = sub.add_parser("stub-ml", help="run a stand-in ML client")
+    stub.add_argument("--port", type=int, default=5002)
+    stub.add_argument("--delay-ms", type=float, default=50)
+
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument(
+        "--ml-url", help="send frames straight to an ML client (skips web app)"
+    )
+    parser.add_argument(
+        "--steps",
+        default="1,5,10,20",
+        type=lambda s: [int(n) for n in s.split(",")],
+        help="comma-separated concurrent session counts",
+    )
+    parser.add_argument("--step-seconds", type=float, default=30)
+    parser.add_argument("--cadence", type=float, default=DEFAULT_CADENCE)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--frames", help="directory of recorded .jpg frames")
+    parser.add_argument(
+        "--user-template",
+        default="loadtest.{i}@example.com",
+        help="email per session; {i} is the session index",
+    )
+    parser.add_argument("--password", default=LOADTEST_PASSWORD)
+    parser.add_argument(
+        "--register", action="store_true", help="create the users first"
+    )
+    parser.add_argument(
+        "--login-timeout",
+        type=float,
+        default=DEFAULT_LOGIN_TIMEOUT,
+        help="seconds a session keeps retrying throttled logins",
+    )
+    parser.add_argument("--mongo-uri", help="also measure MongoDB write throughput")
+    parser.add_argument("--json", help="write full step results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    cli_args = parse_args()
+    if cli_args.command == "stub-ml":
+        run_stub_ml(cli_args)
+    else:
+        run_load(cli_args)
@@ -0,0 +1,7 @@
+"""Pytest configuration for tools tests."""
+
+import os
+import sys
+
+# The tools are standalone scripts, imported here as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
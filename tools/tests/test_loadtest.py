@@ -0,0 +1,107 @@
+"""Tests for the load generator's bookkeeping and login handling."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from loadtest import StepStats, diagnose, post_form
+
+
+def make_step(**overrides):
+    """A healthy step summary; tests override the fields they care about."""
+    step = {
+        "ok": 100,
+        "p95_ms": 200.0,
+        "success_ratio": 1.0,
+        "statuses": {200: 100},
+        "ml_quality": {},
+        "ml_in_flight_avg": 0.5,
+        "mongo": None,
+        "login": {"ok": 4},
+    }
+    step.update(overrides)
+    return step
+
+
+def response(status, retry_after=None):
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return Mock(status_code=status, headers=headers)
+
+
+def test_summary_counts_offered_load_for_logged_in_sessions():
+    """Test that sessions that never logged in offer no frames."""
+    stats = StepStats(sessions=4)
+    stats.started, stats.finished = 0.0, 10.0
+    stats.record_login(True)
+    stats.record_login(True)
+    stats.record_login(False)
+    for _ in range(30):
+        stats.record(0.1, 200)
+    stats.record(0.1, 429)
+
+    summary = stats.summary(cadence=0.5)
+
+    # 2 sessions x 10 s / 0.5 s = 40 frames offered, 30 succeeded
+    assert summary["offered_fps"] == 4.0
+    assert summary["throughput_fps"] == 3.0
+    assert summary["success_ratio"] == 0.75
+    assert summary["requests"] == 31
+    assert summary["login"]["ok"] == 2
+    assert summary["login"]["failed"] == 1
+
+
+def test_summary_without_logins_has_no_success_ratio():
+    """Test that a step where nobody logged in does not divide by zero."""
+    stats = StepStats(sessions=2)
+    stats.started, stats.finished = 0.0, 5.0
+    summary = stats.summary(cadence=0.35)
+    assert summary["offered_fps"] == 0
+    assert summary["success_ratio"] == 0
+
+
+@pytest.mark.parametrize(
+    "overrides, expected",
+    [
+        ({}, "ok"),
+        ({"login": {"ok": 0}, "success_ratio": 0}, "no session logged in"),
+        ({"p95_ms": 2000.0, "mongo": {"inserted": 50}}, "mongo (writes lag"),
+        ({"success_ratio": 0.5, "ml_in_flight_avg": 3}, "ml (frames queue"),
+        ({"p95_ms": 2000.0, "ml_quality": {"low": 10}}, "ml (running at reduced"),
+        ({"success_ratio": 0.5, "statuses": {200: 50, 429: 50}}, "admission limit"),
+        ({"p95_ms": 2000.0}, "web app"),
+    ],
+)
+def test_diagnose(overrides, expected):
+    """Test which tier is blamed for a saturated step."""
+    assert diagnose(make_step(**overrides)).startswith(expected)
+
+
+@patch("loadtest.time.sleep")
+def test_post_form_waits_out_throttling(mock_sleep):
+    """Test that 429s are retried after Retry-After and counted."""
+    http = Mock()
+    http.post.side_effect = [response(429, "2"), response(429, "1"), response(302)]
+    stats = StepStats(sessions=1)
+
+    result = post_form(http, "http://web/", {"username": "a"}, stats, float("inf"))
+
+    assert result.status_code == 302
+    assert http.post.call_count == 3
+    assert [c.args for c in mock_sleep.call_args_list] == [(2.0,), (1.0,)]
+    assert stats.login_throttled == 2
+    assert stats.login_wait == 3.0
+
+
+@patch("loadtest.time.sleep")
+@patch("loadtest.time.monotonic", return_value=100.0)
+def test_post_form_gives_up_at_deadline(_mock_monotonic, mock_sleep):
+    """Test that a wait past the deadline raises instead of sleeping."""
+    http = Mock()
+    http.post.return_value = response(429, "30")
+    stats = StepStats(sessions=1)
+
+    with pytest.raises(RuntimeError, match="still throttled"):
+        post_form(http, "http://web/", {"username": "a"}, stats, deadline=110.0)
+
+    mock_sleep.assert_not_called()
+    assert stats.login_throttled == 1
@@ -0,0 +1,88 @@
+"""
+Token-bucket admission control.
+ - Frames: each user gets a bucket refilled at the tracking page's frame
+   cadence, so one client sending frames too fast is rejected early
+   instead of starving everyone else's ML capacity.
+ - Logins: attempts are limited per client IP and per account before
+   any password hash is computed, so login bursts cannot pin the CPU.
+"""
+
+import os
+import threading
+import time
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# tracking.js sends one frame every 350 ms
+FRAME_RATE = float(os.getenv("ADMISSION_FRAME_RATE", str(1 / 0.35)))
+
+# Short bursts allowed above the rate (e.g. after a network hiccup)
+FRAME_BURST = float(os.getenv("ADMISSION_FRAME_BURST", "4"))
+
+# Login attempts per client IP: sustained rate (per second) and burst
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE", "0.5"))
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", "10"))
+
+# Login attempts per account (guards against distributed guessing)
+LOGIN_ACCOUNT_RATE = float(os.getenv("LOGIN_ACCOUNT_RATE", "0.1"))
+LOGIN_ACCOUNT_BURST = float(os.getenv("LOGIN_ACCOUNT_BURST", "5"))
+
+# Buckets idle longer than this are forgotten (seconds)
+IDLE_EXPIRY = 600
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/second, up to `capacity`."""
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now):
+        """Consume one token. Returns seconds to wait (0 when admitted)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Keeps one token bucket per user."""
+
+    def __init__(self, rate=FRAME_RATE, burst=FRAME_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+
+    def admit(self, key):
+        """
+        Try to admit one frame for `key`.
+        Returns (admitted, retry_after_seconds).
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst, now)
+                self._buckets[key] = bucket
+            wait = bucket.take(now)
+            self._sweep(now)
+        return wait == 0, wait
+
+    def _sweep(self, now):
+        if now - self._last_sweep < IDLE_EXPIRY:
+            return
+        self._last_sweep = now
+        for key, bucket in list(self._buckets.items()):
+            if now - bucket.updated > IDLE_EXPIRY:
+                del self._buckets[key]
@@ -0,0 +1,194 @@
+"""
+Score distribution analytics backed by per-day sketches.
+
+Each `daily_stats` document (maintained by the ML client on every insert)
+holds a fixed 101-bin histogram of integer scores plus per-state sample
+counts and tracked seconds. Histograms merge by adding bins, so a
+percentile over a month or a year merges at most 31 / 366 small
+documents instead of scanning raw samples.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+
+# ============================================================
+# HISTOGRAM SKETCH HELPERS
+# ============================================================
+
+NUM_BINS = 101  # one bin per integer score 0..100
+
+# Width of the coarse buckets returned for charts
+DISPLAY_BUCKET = 10
+
+PERCENTILES = (10, 50, 90)
+
+
+def empty_sketch():
+    return {"count": 0, "score_sum": 0, "hist": {}, "states": {}, "state_seconds": {}}
+
+
+def merge(sketches):
+    """Add several daily sketches into one."""
+    total = empty_sketch()
+    for sketch in sketches:
+        total["count"] += sketch.get("count", 0)
+        total["score_sum"] += sketch.get("score_sum", 0)
+        for field in ("hist", "states", "state_seconds"):
+            for key, value in (sketch.get(field) or {}).items():
+                total[field][key] = total[field].get(key, 0) + value
+    return total
+
+
+def percentile(hist, p):
+    """Score at percentile `p` (0-100) of a histogram; None when empty."""
+    total = sum(hist.values())
+    if not total:
+        return None
+    # Nearest-rank: smallest score with at least p% of samples at or below
+    rank = max(1, -(-p * total // 100))
+    seen = 0
+    for score in range(NUM_BINS):
+        seen += hist.get(str(score), 0)
+        if seen >= rank:
+            return score
+    return NUM_BINS - 1
+
+
+def bucketed(hist, width=DISPLAY_BUCKET):
+    """Collapse the 101 bins into [0-9, 10-19, ..., 90-100] counts."""
+    buckets = [0] * (100 // width)
+    for score, count in hist.items():
+        buckets[min(int(score) // width, len(buckets) - 1)] += count
+    return buckets
+
+
+def summarize(sketch):
+    """Public JSON shape for one (possibly merged) sketch."""
+    count = sketch["count"]
+    hist = sketch["hist"]
+    summary = {
+        "count": count,
+        "avg_score": round(sketch["score_sum"] / count) if count else None,
+        "histogram": bucketed(hist),
+        "time_in_state": {
+            state: round(seconds) for state, seconds in sketch["state_seconds"].items()
+        },
+        "state_counts": sketch["states"],
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(hist, p)
+    return summary
+
+
+# ============================================================
+# QUERIES
+# ============================================================
+
+
+def day_key(day):
+    return day.strftime("%Y-%m-%d")
+
+
+def load_days(collection, start, end):
+    """Daily sketches for start..end (inclusive dates), keyed by YYYY-MM-DD."""
+    cursor = collection.find({"_id": {"$gte": day_key(start), "$lte": day_key(end)}})
+    return {doc["_id"]: doc for doc in cursor}
+
+
+def daily_distribution(collection, days):
+    """Per-day summaries for the last `days` days (UTC), oldest first."""
+    today = datetime.now(timezone.utc).date()
+    start = today - timedelta(days=days - 1)
+    docs = load_days(collection, start, today)
+    return [
+        {"date": key, **summarize(merge([doc]))} for key, doc in sorted(docs.items())
+    ]
+
+
+def monthly_distribution(collection, months):
+    """Per-month summaries for the last `months` months, oldest first."""
+    today = datetime.now(timezone.utc).date()
+    year, month = today.year, today.month - (months - 1)
+    while month < 1:
+        year, month = year - 1, month + 12
+    docs = load_days(collection, today.replace(year=year, month=month, day=1), today)
+
+    by_month = {}
+    for key, doc in docs.items():
+        by_month.setdefault(key[:7], []).append(doc)
+    return [
+        {"month": month_key, **summarize(merge(group))}
+        for month_key, group in sorted(by_month.items())
+    ]
+
+
+def range_distribution(collection, start, end):
+    """One merged summary for start..end (inclusive dates)."""
+    docs = load_days(collection, start, end)
+    return {
+        "start": day_key(start),
+        "end": day_key(end),
+        "days": len(docs),
+        **summarize(merge(docs.values())),
+    }
+
+
+# ============================================================
+# BACKFILL (samples stored before daily_stats existed)
+# ============================================================
+
+# Must match the ML client's cap on time credited to one sample
+MAX_SAMPLE_GAP = 10
+
+
+def build_day_sketch(samples, day):
+    """Build one day's sketch from raw samples (one sorted pass)."""
+    start = datetime(day.year, day.month, day.day)
+    cursor = samples.find(
+        {"timestamp": {"$gte": start, "$lt": start + timedelta(days=1)}},
+        {"score": 1, "state": 1, "timestamp": 1},
+    ).sort("timestamp", 1)
+
+    sketch = empty_sketch()
+    previous = None
+    for s in cursor:
+        score = str(int(round(max(0, min(100, s.get("score") or 0)))))
+        state = s.get("state") or "unknown"
+        gap = 0
+        if previous is not None:
+            gap = min((s["timestamp"] - previous).total_seconds(), MAX_SAMPLE_GAP)
+        previous = s["timestamp"]
+
+        sketch["count"] += 1
+        sketch["score_sum"] += int(score)
+        sketch["hist"][score] = sketch["hist"].get(score, 0) + 1
+        sketch["states"][state] = sketch["states"].get(state, 0) + 1
+        sketch["state_seconds"][state] = sketch["state_seconds"].get(state, 0) + gap
+    return sketch
+
+
+def backfill(samples, collection, days):
+    """
+    Create sketches for past days (before today) that have none yet.
+    Days already aggregated are left untouched. Returns days written.
+    """
+    today = datetime.now(timezone.utc).date()
+    existing = load_days(collection, today - timedelta(days=days), today)
+    written = 0
+    for offset in range(1, days + 1):
+        day = today - timedelta(days=offset)
+        if day_key(day) in existing:
+            continue
+        sketch = build_day_sketch(samples, day)
+        if sketch["count"]:
+            collection.insert_one({"_id": day_key(day), **sketch})
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    import sys
+    from db import daily_stats, samples as posture_samples
+
+    n_days = int(sys.argv[1]) if len(sys.argv) > 1 else 366
+    print(f"[STATS] Backfilled {backfill(posture_samples, daily_stats, n_days)} days")
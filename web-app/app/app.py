@@ -1,15 +1,97 @@
+import math
 import os
+import uuid
 import requests
 from datetime import datetime, timedelta, timezone
-from flask import Flask, render_template, request, redirect, session, jsonify
-from db import create_user, validate_user, users, samples
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    request,
+    redirect,
+    session,
+    jsonify,
+    stream_with_context,
+)
+from db import (
+    create_user,
+    validate_user,
+    get_user_profile,
+    public_profile,
+    users,
+    samples,
+    daily_stats,
+)
+from live import DASHBOARD_CHANNEL, broker, parse_last_event_id
+from ml_pool import pool_from_env
+from local_transport import LocalTransport, TransportError
+from admission import (
+    AdmissionController,
+    LOGIN_ACCOUNT_BURST,
+    LOGIN_ACCOUNT_RATE,
+    LOGIN_IP_BURST,
+    LOGIN_IP_RATE,
+)
+from cache import profile_cache
+from analytics import daily_distribution, monthly_distribution, range_distribution
+from profiling import current_timings, install_profiling, parse_timings_header, stage
 
 
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "devsecret")
+install_profiling(app)
+
+# ML Client backends (ML_CLIENT_URL, ML_CLIENT_URLS or ML_CLIENT_DNS)
+ml_pool = pool_from_env()
+
+# Unix socket to a co-located ML client (ML_SOCKET_PATH); HTTP otherwise.
+# It bypasses the pool's routing, so it is ignored with several backends.
+local_transport = LocalTransport()
+if local_transport.path and ml_pool.is_multi_node():
+    print("[LOCAL] ML_SOCKET_PATH ignored: more than one ML backend configured")
+    local_transport.path = ""
+
+# Per-user frame rate limit (token bucket)
+admission = AdmissionController()
+
+# Login/register attempt limits, checked before any password hashing
+login_ip_limit = AdmissionController(LOGIN_IP_RATE, LOGIN_IP_BURST)
+login_account_limit = AdmissionController(LOGIN_ACCOUNT_RATE, LOGIN_ACCOUNT_BURST)
+
+
+def throttled(template, *keys_and_limits):
+    """Render `template` with a 429 if any (limiter, key) pair is over its limit."""
+    for limiter, key in keys_and_limits:
+        admitted, retry_after = limiter.admit(key)
+        if not admitted:
+            wait = math.ceil(retry_after)
+            return (
+                render_template(
+                    template,
+                    error=f"Too many attempts. Try again in {wait} seconds.",
+                ),
+                429,
+                {"Retry-After": str(wait)},
+            )
+    return None
+
+
+def current_user():
+    """Logged-in user's profile (cached); None when not logged in."""
+    if "user" not in session:
+        return None
+    if "user_id" in session:
+        return get_user_profile(session["user_id"])
+
+    # Sessions from before user ids were stored: look up once and upgrade
+    user = users.find_one({"email": session["user"]})
+    if not user:
+        return None
+    profile = public_profile(user)
+    session["user_id"] = profile["_id"]
+    profile_cache.set(profile["_id"], profile)
+    return profile
 
-# ML Client URL
-ML_CLIENT_URL = os.getenv("ML_CLIENT_URL", "http://ml-client:5002")
 
 # ============================================================
 # AUTH ROUTES
@@ -22,11 +104,22 @@ def login():
         email = request.form.get("username")
         password = request.form.get("password")
 
+        rejected = throttled(
+            "login.html",
+            (login_ip_limit, request.remote_addr),
+            (login_account_limit, (email or "").strip().lower()),
+        )
+        if rejected:
+            return rejected
+
         valid, result = validate_user(email, password)
         if not valid:
             return render_template("login.html", error=result)
 
+        profile = public_profile(result)
+        profile_cache.set(profile["_id"], profile)
         session["user"] = result["email"]
+        session["user_id"] = profile["_id"]
         return redirect("/dashboard")
 
     return render_template("login.html")
@@ -40,6 +133,10 @@ def register():
         password = request.form.get("password")
         confirm = request.form.get("password_confirm")
 
+        rejected = throttled("register.html", (login_ip_limit, request.remote_addr))
+        if rejected:
+            return rejected
+
         if password != confirm:
             return render_template("register.html", error="Passwords do not match.")
 
@@ -54,11 +151,10 @@ def register():
 
 @app.route("/dashboard")
 def dashboard():
-    if "user" not in session:
+    user = current_user()
+    if user is None:
         return redirect("/")
 
-    user = users.find_one({"email": session["user"]})
-
     # --- default safe values ---
     avg_score = 0
     slouch_count = 0
@@ -66,6 +162,8 @@ def dashboard():
     duration_minutes = 0
     hours = 0
     mins = 0
+    score_sum = 0
+    first_ts = None
 
     # --- fetch today's posture samples ---
     from datetime import datetime, timedelta
@@ -77,7 +175,8 @@ def dashboard():
 
     if today_samples:
         total_samples = len(today_samples)
-        avg_score = round(sum(s["score"] for s in today_samples) / total_samples)
+        score_sum = sum(s["score"] for s in today_samples)
+        avg_score = round(score_sum / total_samples)
         slouch_count = sum(1 for s in today_samples if s["state"] == "slouch")
 
         # Calculate actual time from first to last sample
@@ -85,6 +184,7 @@ def dashboard():
             timestamps = [s["timestamp"] for s in today_samples]
             first_time = min(timestamps)
             last_time = max(timestamps)
+            first_ts = first_time.replace(tzinfo=timezone.utc).timestamp()
             duration_seconds = (last_time - first_time).total_seconds()
             duration_minutes = round(duration_seconds / 60)
         else:
@@ -103,6 +203,8 @@ def dashboard():
         duration_minutes=duration_minutes,
         hours=hours,
         mins=mins,
+        score_sum=score_sum,
+        first_ts=first_ts,
     )
 
 
@@ -183,10 +285,48 @@ def yearly_stats():
     return jsonify(yearly)
 
 
+@app.route("/api/stats/distribution/daily")
+def daily_distribution_stats():
+    """Per-day histogram, p10/p50/p90 and time in state (?days=7, max 366)."""
+    days = min(max(request.args.get("days", 7, type=int), 1), 366)
+    return jsonify(daily_distribution(daily_stats, days))
+
+
+@app.route("/api/stats/distribution/monthly")
+def monthly_distribution_stats():
+    """Per-month histogram, p10/p50/p90 and time in state (?months=12)."""
+    months = min(max(request.args.get("months", 12, type=int), 1), 24)
+    return jsonify(monthly_distribution(daily_stats, months))
+
+
+@app.route("/api/stats/percentiles")
+def percentile_stats():
+    """Merged distribution for ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: 1 year)."""
+    today = datetime.now(timezone.utc).date()
+    try:
+        end = datetime.strptime(request.args["end"], "%Y-%m-%d").date()
+    except KeyError:
+        end = today
+    except ValueError:
+        return jsonify({"error": "end must be YYYY-MM-DD"}), 400
+    try:
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d").date()
+    except KeyError:
+        start = end - timedelta(days=365)
+    except ValueError:
+        return jsonify({"error": "start must be YYYY-MM-DD"}), 400
+
+    if start > end or (end - start).days > 366:
+        return jsonify({"error": "range must be 0-366 days"}), 400
+    return jsonify(range_distribution(daily_stats, start, end))
+
+
 @app.route("/tracking")
 def tracking():
     if "user" not in session:
         return redirect("/")
+    # New tracking session → routed consistently to one ML node
+    session["tracking_id"] = uuid.uuid4().hex
     return render_template("tracking.html")
 
 
@@ -198,32 +338,107 @@ def tracking():
 @app.route("/api/status")
 def status():
     """Check status of ML client."""
+    backend = ml_pool.pick(session.get("tracking_id"))
+    if backend is None:
+        return jsonify({"status": "ML client unreachable"}), 503
     try:
-        response = requests.get(f"{ML_CLIENT_URL}/health", timeout=2)
-        return jsonify(response.json()), response.status_code
+        response = requests.get(f"{backend.url}/health", timeout=2)
+        body = response.json()
+        body["backends"] = ml_pool.snapshot()
+        return jsonify(body), response.status_code
     except requests.exceptions.RequestException:
         return jsonify({"status": "ML client unreachable"}), 503
 
 
+def forward_frame(frame, profile=False):
+    """
+    Send one uploaded frame to the ML client, over the local Unix socket
+    when it is co-located and over HTTP otherwise.
+    Returns (status_code, body, timings_header).
+    """
+    # Tracking session: ML routing key and time-in-state source
+    key = session.get("tracking_id") or session.get("user")
+    if local_transport.available():
+        try:
+            return local_transport.process(frame.read(), profile=profile, source=key)
+        except TransportError:
+            frame.stream.seek(0)
+
+    headers = {"X-Tracking-Id": key} if key else {}
+    # Ask the ML client for its stage timings too when profiling
+    if profile:
+        headers["X-Profile"] = "1"
+    response = ml_pool.post_frame(key, {"frame": frame}, timeout=5, headers=headers)
+    body = response.json() if response.status_code == 200 else {}
+    return (
+        response.status_code,
+        body,
+        response.headers.get("X-Stage-Timings"),
+    )
+
+
 @app.route("/process", methods=["POST"])
 def process_frame():
     """Forward frame to ML client for analysis."""
     if "frame" not in request.files:
         return jsonify({"error": "missing frame"}), 400
 
+    # Reject frames above the user's rate before they reach the ML client
+    with stage("admission"):
+        admitted, retry_after = admission.admit(
+            session.get("user") or request.remote_addr
+        )
+    if not admitted:
+        return (
+            jsonify({"error": "too many frames", "retry_after": round(retry_after, 2)}),
+            429,
+            {"Retry-After": str(math.ceil(retry_after))},
+        )
+
     # Forward the frame to ML client
     try:
-        files = {"frame": request.files["frame"]}
-        response = requests.post(f"{ML_CLIENT_URL}/process", files=files, timeout=5)
-
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
+        timings = current_timings()
+        with stage("ml_proxy"):
+            status, result, ml_timings = forward_frame(
+                request.files["frame"], profile=timings is not None
+            )
+
+        if timings is not None:
+            for name, ms in parse_timings_header(ml_timings).items():
+                timings.add(f"ml.{name}", ms)
+
+        if status == 200:
+            # Push the result to every open dashboard; like the samples it
+            # extends, the live view is not scoped to a user
+            with stage("publish"):
+                broker.publish(DASHBOARD_CHANNEL, result)
+            return jsonify(result), 200
+        if status == 503:
+            return jsonify(result), 503
         return jsonify({"error": "ML processing failed"}), 500
 
     except requests.exceptions.RequestException as error:
         return jsonify({"error": f"ML client unavailable: {str(error)}"}), 503
 
 
+@app.route("/api/live")
+def live_stream():
+    """Server-Sent Events stream of every posture result, for the dashboard."""
+    if "user" not in session:
+        return jsonify({"error": "not logged in"}), 401
+
+    last_event_id = parse_last_event_id(
+        request.headers.get("Last-Event-ID", request.args.get("last_event_id"))
+    )
+    stream = broker.stream(DASHBOARD_CHANNEL, last_event_id)
+
+    return Response(
+        stream_with_context(stream),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ============================================================
 @app.route("/logout")
 def logout():
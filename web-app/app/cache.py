@@ -0,0 +1,62 @@
+"""
+Small in-process TTL cache.
+Used for user profiles so authenticated page views skip MongoDB.
+Each web process has its own copy; TTL bounds how stale an entry can
+get when another process changes the underlying document.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Seconds a cached user profile stays valid
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# Most profiles kept before the least recently used is evicted
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+
+class TTLCache:
+    """LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, ttl, maxsize, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value, or None when missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+profile_cache = TTLCache(USER_CACHE_TTL, USER_CACHE_SIZE)
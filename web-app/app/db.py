@@ -1,7 +1,7 @@
 """
 Unified MongoDB helper for SitStraight.
 Handles:
- - User accounts
+ - User accounts (with a cached profile lookup by id)
  - Posture sample saving
  - Safe MongoDB connection (Docker or localhost)
 """
@@ -10,9 +10,12 @@ import os
 import re
 import sys
 from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
 from pymongo import MongoClient
 from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure
 from werkzeug.security import generate_password_hash, check_password_hash
+from cache import profile_cache
 
 
 # ============================================================
@@ -58,6 +61,8 @@ db = client["sitstraight"]
 
 users = db["users"]
 samples = db["posture_samples"]
+# Per-day score histograms / state times (written by the ML client)
+daily_stats = db["daily_stats"]
 
 
 # ============================================================
@@ -135,6 +140,34 @@ def validate_user(email, password):
     return True, user
 
 
+def public_profile(user):
+    """User document without the password hash, with a string id."""
+    profile = {k: v for k, v in user.items() if k != "password"}
+    profile["_id"] = str(user["_id"])
+    return profile
+
+
+def get_user_profile(user_id):
+    """
+    Profile for `user_id`, served from the in-process cache when
+    possible. Returns None for unknown or malformed ids.
+    """
+    profile = profile_cache.get(user_id)
+    if profile is not None:
+        return profile
+
+    try:
+        user = users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
+    except (InvalidId, TypeError):
+        return None
+    if not user:
+        return None
+
+    profile = public_profile(user)
+    profile_cache.set(user_id, profile)
+    return profile
+
+
 # ============================================================
 # POSTURE SAMPLE SAVING
 # ============================================================
@@ -0,0 +1,194 @@
+"""
+In-process pub/sub for live posture updates.
+Handles:
+ - Fan-out of posture results to every open tab of a user
+ - Bounded per-subscriber queues (oldest events dropped first)
+ - Server-Sent Events formatting, heartbeats and reconnect replay
+"""
+
+import itertools
+import json
+import os
+import threading
+from collections import deque
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# Events buffered per open tab before the oldest is dropped
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "64"))
+
+# Recent events kept per user so a reconnecting tab can catch up
+REPLAY_BUFFER_SIZE = int(os.getenv("LIVE_REPLAY_SIZE", "32"))
+
+# Seconds of silence before a heartbeat comment is sent
+HEARTBEAT_INTERVAL = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+
+# Reconnect delay suggested to the browser (milliseconds)
+RETRY_MS = int(os.getenv("LIVE_RETRY_MS", "3000"))
+
+# Channel shared by every dashboard; posture samples carry no user, so the
+# dashboard's "today" numbers cover all users and live updates must too
+DASHBOARD_CHANNEL = "dashboard"
+
+
+# ============================================================
+# SUBSCRIBER
+# ============================================================
+
+
+class Subscriber:
+    """One open stream (browser tab) listening for a user's events."""
+
+    def __init__(self, user, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.user = user
+        self.queue = deque(maxlen=maxsize)
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        """Queue an event, dropping the oldest one if the queue is full."""
+        with self._cond:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return all pending events, waiting up to `timeout` seconds."""
+        with self._cond:
+            if not self.queue and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self.queue)
+            self.queue.clear()
+            return events
+
+    def close(self):
+        """Wake up any waiting reader and mark the stream finished."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+# ============================================================
+# BROKER
+# ============================================================
+
+
+class LiveBroker:
+    """Routes published events to every subscriber of the same user."""
+
+    def __init__(
+        self,
+        queue_size=SUBSCRIBER_QUEUE_SIZE,
+        replay_size=REPLAY_BUFFER_SIZE,
+    ):
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self._subscribers = {}
+        self._history = {}
+        self._ids = itertools.count(1)
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user):
+        """Register a new stream for `user` and return it."""
+        sub = Subscriber(user, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        """Remove a stream; safe to call more than once."""
+        with self._lock:
+            subs = self._subscribers.get(sub.user)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user]
+        sub.close()
+
+    def subscriber_count(self, user):
+        """Number of open streams for `user`."""
+        with self._lock:
+            return len(self._subscribers.get(user, ()))
+
+    def publish(self, user, data, event="posture"):
+        """Send `data` to every open stream of `user`. Returns the event id."""
+        with self._lock:
+            event_id = next(self._ids)
+            self.last_id = event_id
+            item = {"id": event_id, "event": event, "data": data}
+            history = self._history.setdefault(user, deque(maxlen=self.replay_size))
+            history.append(item)
+            subs = list(self._subscribers.get(user, ()))
+
+        for sub in subs:
+            sub.put(item)
+        return event_id
+
+    def replay(self, user, last_event_id):
+        """Buffered events for `user` newer than `last_event_id`."""
+        with self._lock:
+            history = list(self._history.get(user, ()))
+        return [item for item in history if item["id"] > last_event_id]
+
+    def stream(self, user, last_event_id=None, heartbeat=HEARTBEAT_INTERVAL):
+        """
+        Generator yielding SSE text for `user` until the client disconnects.
+        Replays missed events when `last_event_id` is given.
+        """
+        # Ids restart with the process; an id from before a restart is stale
+        if last_event_id is not None and last_event_id > self.last_id:
+            last_event_id = None
+
+        sub = self.subscribe(user)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+
+            # Subscribing first means nothing published during the replay is
+            # lost; `sent` filters the overlap between replay and queue.
+            sent = 0
+            if last_event_id is not None:
+                sent = last_event_id
+                for item in self.replay(user, last_event_id):
+                    sent = item["id"]
+                    yield format_sse(item)
+
+            while not sub.closed:
+                events = sub.get(timeout=heartbeat)
+                if not events:
+                    yield ": heartbeat\n\n"
+                    continue
+                for item in events:
+                    if item["id"] <= sent:
+                        continue
+                    sent = item["id"]
+                    yield format_sse(item)
+        finally:
+            self.unsubscribe(sub)
+
+
+# ============================================================
+# SSE HELPERS
+# ============================================================
+
+
+def format_sse(item):
+    """Format one broker event as an SSE message."""
+    payload = json.dumps(item["data"], default=str)
+    return f"id: {item['id']}\nevent: {item['event']}\ndata: {payload}\n\n"
+
+
+def parse_last_event_id(value):
+    """Parse the Last-Event-ID header; returns None when absent or invalid."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+broker = LiveBroker()
@@ -0,0 +1,196 @@
+"""
+Unix domain socket client for a co-located ML client.
+
+When ML_SOCKET_PATH points at the ML client's frame socket (e.g. on a
+shared Docker volume), frames are sent over it as length-prefixed
+messages instead of HTTP multipart over TCP:
+
+    [header length: u32][payload length: u32][header JSON][payload bytes]
+
+Connections are kept open in a small pool shared by all threads: the
+Flask server handles each request on a new thread, so per-thread
+connections would reconnect for every frame. If the socket is missing or a frame cannot be delivered, the transport backs off and
+callers fall back to HTTP automatically. A frame that was delivered is
+never re-sent, so a slow ML client cannot store the same sample twice.
+
+Sending to the socket bypasses the ML pool (affinity, health checks),
+so it is only used when a single ML backend is configured; app.py
+ignores ML_SOCKET_PATH otherwise.
+
+NOTE: the ML client's local_transport.py implements the server side of
+the same framing; keep the two in sync.
+"""
+
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# Socket created by the ML client; empty = always use HTTP
+ML_SOCKET_PATH = os.getenv("ML_SOCKET_PATH", "")
+
+# After a failure, use HTTP for this long before trying the socket again
+RETRY_AFTER = 30
+
+# Idle connections kept open for reuse; extra ones are closed
+POOL_SIZE = int(os.getenv("ML_SOCKET_POOL_SIZE", "8"))
+
+PREFIX = struct.Struct("!II")  # header length, payload length
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class TransportError(Exception):
+    """The local socket could not carry the request; use HTTP instead."""
+
+
+# ============================================================
+# FRAMING
+# ============================================================
+
+
+def recv_exact(sock, size):
+    """Read exactly `size` bytes; raises ConnectionError on early EOF."""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = sock.recv_into(view[got:], size - got)
+        if n == 0:
+            raise ConnectionError("connection closed by ML client")
+        got += n
+    return buf
+
+
+def send_message(sock, header, payload=b""):
+    """Write one message; scatter-gather avoids joining the payload."""
+    header_bytes = json.dumps(header).encode()
+    parts = [PREFIX.pack(len(header_bytes), len(payload)), header_bytes]
+    if payload:
+        parts.append(payload)
+
+    total = sum(len(p) for p in parts)
+    sent = sock.sendmsg(parts)
+    if sent < total:
+        # Rare partial write: finish with a plain sendall of the remainder
+        sock.sendall(memoryview(b"".join(parts))[sent:])
+
+
+def recv_message(sock):
+    """Read one message; returns (header_dict, payload)."""
+    header_len, payload_len = PREFIX.unpack(recv_exact(sock, PREFIX.size))
+    if header_len > MAX_HEADER_BYTES:
+        raise ConnectionError("response header too large")
+    header = json.loads(recv_exact(sock, header_len)) if header_len else {}
+    payload = recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+
+# ============================================================
+# CLIENT
+# ============================================================
+
+
+class LocalTransport:
+    """Sends frames to the ML client over its Unix socket."""
+
+    def __init__(
+        self,
+        path=ML_SOCKET_PATH,
+        timeout=5,
+        retry_after=RETRY_AFTER,
+        pool_size=POOL_SIZE,
+    ):
+        self.path = path
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.pool_size = pool_size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+
+    def available(self):
+        """True when the socket exists and has not failed recently."""
+        return (
+            bool(self.path)
+            and time.monotonic() >= self._down_until
+            and os.path.exists(self.path)
+        )
+
+    def _checkout(self):
+        """Take an idle connection or open one. Returns (sock, reused)."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock, False
+
+    def _checkin(self, sock):
+        """Return a healthy connection to the pool (or close it if full)."""
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(sock)
+                return
+        sock.close()
+
+    def _close_idle(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+    def _mark_down(self, error):
+        self._down_until = time.monotonic() + self.retry_after
+        print(f"[LOCAL] Socket transport failed, using HTTP: {error}")
+
+    def process(self, frame_bytes, profile=False, source=None):
+        """
+        Analyze one encoded frame.
+        Returns (status_code, body_dict, timings_header).
+        Raises TransportError when the frame was not delivered and the
+        caller should fall back to HTTP. A delivered frame is never sent
+        again (the ML client may already have stored it): a timeout or
+        lost connection after sending returns a 503 instead.
+        """
+        header = {"op": "process", "profile": bool(profile), "source": source}
+        # Pooled connections may have been closed by an ML restart (sending
+        # then fails with EPIPE): drop them and retry once on a fresh one
+        for attempt in range(2):
+            sock, reused = None, False
+            try:
+                sock, reused = self._checkout()
+                send_message(sock, header, frame_bytes)
+                break
+            except OSError as error:
+                if sock is not None:
+                    sock.close()
+                if reused and attempt == 0:
+                    self._close_idle()
+                    continue
+                self._mark_down(error)
+                raise TransportError(str(error)) from error
+
+        try:
+            response, _ = recv_message(sock)
+        except (OSError, ValueError) as error:
+            sock.close()
+            self._mark_down(error)
+            return 503, {"error": f"ML client unavailable: {error}"}, ""
+        self._checkin(sock)
+        return (
+            response.get("status", 500),
+            response.get("body", {}),
+            response.get("timings", ""),
+        )
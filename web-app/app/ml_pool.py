@@ -0,0 +1,337 @@
+"""
+Pool of ML client backends for the web app.
+Handles:
+ - Backend discovery from a URL list or a DNS name
+ - Consistent hashing on tracking session (keeps detectors warm)
+ - Active health checks against /health
+ - Least-outstanding-requests fallback
+ - Graceful draining of nodes that leave the pool
+"""
+
+import bisect
+import hashlib
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+# Comma-separated backend URLs, e.g. "http://ml-1:5002,http://ml-2:5002"
+ML_CLIENT_URLS = os.getenv("ML_CLIENT_URLS", "")
+
+# Single URL (original setting); used when ML_CLIENT_URLS is empty
+ML_CLIENT_URL = os.getenv("ML_CLIENT_URL", "http://ml-client:5002")
+
+# Resolve this URL's host to every A record and use each as a backend
+ML_CLIENT_DNS = os.getenv("ML_CLIENT_DNS", "")
+
+HEALTH_INTERVAL = float(os.getenv("ML_HEALTH_INTERVAL", "5"))
+HEALTH_TIMEOUT = 2
+
+# Consecutive failed checks before a node stops receiving traffic
+UNHEALTHY_AFTER = 2
+
+# Hash ring points per backend (more = smoother distribution)
+VIRTUAL_NODES = 100
+
+# A session's home node is skipped when it has this many more requests
+# in flight than the least-loaded node
+OVERLOAD_MARGIN = int(os.getenv("ML_OVERLOAD_MARGIN", "4"))
+
+
+# ============================================================
+# BACKEND
+# ============================================================
+
+
+class Backend:
+    """One ML client node."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.draining = False
+        self.failures = 0
+        self.outstanding = 0
+        self.last_checked = None
+
+    @property
+    def available(self):
+        return self.healthy and not self.draining
+
+    def snapshot(self):
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "outstanding": self.outstanding,
+        }
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+
+class MLPool:
+    """Routes frames to ML backends with session affinity."""
+
+    def __init__(self, urls=None, dns_url=None, health_interval=HEALTH_INTERVAL):
+        self.dns_url = dns_url
+        self.health_interval = health_interval
+        self._static_urls = list(urls or [])
+        self._backends = {}
+        self._ring = []
+        self._ring_urls = []
+        self._lock = threading.Lock()
+        self._checker = None
+        self.set_members(self._discover())
+
+    # ---------------- membership ----------------
+
+    def _discover(self):
+        """Current member URLs from DNS (if configured) or the static list."""
+        if not self.dns_url:
+            return self._static_urls
+
+        parts = urlsplit(self.dns_url)
+        try:
+            infos = socket.getaddrinfo(
+                parts.hostname, parts.port, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror:
+            # Keep the current members rather than emptying the pool
+            return list(self._backends)
+
+        port = f":{parts.port}" if parts.port else ""
+        return sorted({f"{parts.scheme}://{info[4][0]}{port}" for info in infos})
+
+    def set_members(self, urls):
+        """
+        Replace pool membership. New URLs join immediately; missing ones
+        are marked draining and removed once their in-flight requests finish.
+        """
+        urls = {u.rstrip("/") for u in urls}
+        with self._lock:
+            for url in urls:
+                backend = self._backends.get(url)
+                if backend is None:
+                    self._backends[url] = Backend(url)
+                else:
+                    backend.draining = False
+            for url, backend in list(self._backends.items()):
+                if url not in urls:
+                    backend.draining = True
+            self._reap()
+            self._rebuild_ring()
+
+    def drain(self, url):
+        """Stop routing new frames to `url`; it leaves once idle."""
+        with self._lock:
+            backend = self._backends.get(url.rstrip("/"))
+            if backend is not None:
+                backend.draining = True
+                self._reap()
+                self._rebuild_ring()
+
+    def _reap(self):
+        for url, backend in list(self._backends.items()):
+            if backend.draining and backend.outstanding == 0:
+                del self._backends[url]
+
+    def _rebuild_ring(self):
+        points = []
+        for url, backend in self._backends.items():
+            if backend.available:
+                points.extend((_hash(f"{url}#{i}"), url) for i in range(VIRTUAL_NODES))
+        points.sort()
+        self._ring = [p[0] for p in points]
+        self._ring_urls = [p[1] for p in points]
+
+    # ---------------- routing ----------------
+
+    def pick(self, key=None):
+        """
+        Choose a backend: the session's ring owner unless it is overloaded,
+        otherwise the available node with the fewest requests in flight.
+        Returns None when no backend is available.
+        """
+        self.ensure_health_checks()
+        with self._lock:
+            candidates = [b for b in self._backends.values() if b.available]
+            if not candidates:
+                # Everything failed its checks: still try non-draining nodes
+                # rather than refusing outright (checks may be stale)
+                fallback = [b for b in self._backends.values() if not b.draining]
+                return min(fallback, key=lambda b: b.outstanding, default=None)
+
+            least = min(candidates, key=lambda b: b.outstanding)
+            if key is None or not self._ring:
+                return least
+
+            idx = bisect.bisect(self._ring, _hash(str(key))) % len(self._ring)
+            home = self._backends[self._ring_urls[idx]]
+            if home.outstanding - least.outstanding >= OVERLOAD_MARGIN:
+                return least
+            return home
+
+    @contextmanager
+    def track(self, backend):
+        """Count a request as in flight on `backend` for the duration."""
+        with self._lock:
+            backend.outstanding += 1
+        try:
+            yield backend
+        finally:
+            with self._lock:
+                backend.outstanding -= 1
+                if backend.draining:
+                    self._reap()
+
+    def mark_failed(self, backend):
+        """Take a backend out of rotation after a connection error."""
+        with self._lock:
+            backend.failures = UNHEALTHY_AFTER
+            if backend.healthy:
+                backend.healthy = False
+                self._rebuild_ring()
+
+    def post_frame(self, key, files, timeout=5, headers=None):
+        """
+        Send a frame to the session's backend, retrying once on another
+        node if the first one cannot be reached. Errors after the request
+        went out (e.g. the node dropped the connection) are raised, not
+        retried: that node may already have stored the sample.
+        """
+        tried = set()
+        last_error = None
+        for _ in range(2):
+            backend = self.pick(key)
+            if backend is None or backend.url in tried:
+                backend = self._pick_excluding(tried)
+            if backend is None:
+                break
+            tried.add(backend.url)
+
+            for f in files.values():
+                if hasattr(f, "seek"):
+                    f.seek(0)
+            try:
+                with self.track(backend):
+                    return requests.post(
+                        f"{backend.url}/process",
+                        files=files,
+                        headers=headers,
+                        timeout=timeout,
+                    )
+            except requests.exceptions.ConnectionError as error:
+                self.mark_failed(backend)
+                if not connect_failed(error):
+                    raise
+                last_error = error
+
+        if last_error is not None:
+            raise last_error
+        raise requests.exceptions.ConnectionError("no ML backend available")
+
+    def _pick_excluding(self, excluded):
+        with self._lock:
+            candidates = [
+                b
+                for b in self._backends.values()
+                if b.available and b.url not in excluded
+            ]
+            return min(candidates, key=lambda b: b.outstanding, default=None)
+
+    # ---------------- health checks ----------------
+
+    def check_health(self):
+        """Refresh membership and probe every backend's /health once."""
+        if self.dns_url:
+            self.set_members(self._discover())
+
+        with self._lock:
+            backends = list(self._backends.values())
+
+        changed = False
+        for backend in backends:
+            try:
+                ok = (
+                    requests.get(
+                        f"{backend.url}/health", timeout=HEALTH_TIMEOUT
+                    ).status_code
+                    == 200
+                )
+            except requests.exceptions.RequestException:
+                ok = False
+
+            with self._lock:
+                backend.last_checked = time.time()
+                backend.failures = 0 if ok else backend.failures + 1
+                healthy = backend.failures < UNHEALTHY_AFTER
+                if healthy != backend.healthy:
+                    backend.healthy = healthy
+                    changed = True
+                    print(f"[ML POOL] {backend.url} healthy={healthy}")
+
+        if changed:
+            with self._lock:
+                self._rebuild_ring()
+
+    def ensure_health_checks(self):
+        """Start the background checker on first use (not at import)."""
+        if self._checker is not None or not self.health_interval:
+            return
+        with self._lock:
+            if self._checker is not None:
+                return
+            self._checker = threading.Thread(
+                target=self._health_loop, name="ml-health", daemon=True
+            )
+            self._checker.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            try:
+                self.check_health()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"[ML POOL] Health check error: {error}")
+
+    def snapshot(self):
+        with self._lock:
+            return [b.snapshot() for b in self._backends.values()]
+
+    def is_multi_node(self):
+        """True when frames may be spread across more than one ML client."""
+        with self._lock:
+            return bool(self.dns_url) or len(self._backends) > 1
+
+
+def connect_failed(error):
+    """True if a requests ConnectionError happened before anything was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose `reason` is the cause
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def pool_from_env():
+    """Build the pool from ML_CLIENT_URLS / ML_CLIENT_DNS / ML_CLIENT_URL."""
+    if ML_CLIENT_DNS:
+        return MLPool(dns_url=ML_CLIENT_DNS)
+    urls = [u.strip() for u in ML_CLIENT_URLS.split(",") if u.strip()]
+    return MLPool(urls or [ML_CLIENT_URL])
@@ -87,6 +87,9 @@ async function sendFrameToML() {
             body: formData
         });
 
+        // 429 = over the frame rate limit; skip this frame quietly
+        if (!response.ok) return;
+
         const data = await response.json();
         updateFromML(data);
 
@@ -0,0 +1,30 @@
+"""Pytest configuration for web app tests."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Modules in app/ import each other as top-level modules (as in the
+# container). Appended, not prepended, so `app` still names the package.
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+# db.py pings MongoDB at import time; tests patch the collections they use
+patch("pymongo.MongoClient", MagicMock()).start()
+
+
+class FakeClock:
+    """Callable stand-in for time.monotonic; tests advance `now` by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """A FakeClock starting at 0."""
+    return FakeClock()
@@ -0,0 +1,32 @@
+"""Tests for per-user admission control."""
+
+from app.admission import AdmissionController
+
+
+def test_burst_then_reject(clock):
+    """Test that frames beyond the burst are rejected with a retry hint."""
+    admission = AdmissionController(rate=2, burst=3, clock=clock)
+
+    assert all(admission.admit("a@example.com")[0] for _ in range(3))
+    admitted, retry_after = admission.admit("a@example.com")
+    assert admitted is False
+    assert retry_after == 0.5
+
+
+def test_tokens_refill_over_time(clock):
+    """Test that a user is admitted again after waiting."""
+    admission = AdmissionController(rate=2, burst=1, clock=clock)
+
+    assert admission.admit("a@example.com")[0]
+    assert not admission.admit("a@example.com")[0]
+    clock.now += 0.5
+    assert admission.admit("a@example.com")[0]
+
+
+def test_users_are_isolated(clock):
+    """Test that one fast client cannot use up another user's budget."""
+    admission = AdmissionController(rate=1, burst=1, clock=clock)
+
+    assert admission.admit("fast@example.com")[0]
+    assert not admission.admit("fast@example.com")[0]
+    assert admission.admit("other@example.com")[0]
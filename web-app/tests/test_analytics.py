@@ -0,0 +1,68 @@
+"""Tests for score distribution analytics."""
+
+from datetime import datetime, timezone
+from app.analytics import merge, percentile, range_distribution, summarize
+
+
+def sketch(scores, state="aligned", seconds=5):
+    hist = {}
+    for score in scores:
+        hist[str(score)] = hist.get(str(score), 0) + 1
+    return {
+        "count": len(scores),
+        "score_sum": sum(scores),
+        "hist": hist,
+        "states": {state: len(scores)},
+        "state_seconds": {state: seconds * len(scores)},
+    }
+
+
+class FakeCollection:
+    """Minimal stand-in for the daily_stats collection."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        low, high = query["_id"]["$gte"], query["_id"]["$lte"]
+        return [d for d in self.docs if low <= d["_id"] <= high]
+
+
+def test_percentiles_from_histogram():
+    """Test nearest-rank percentiles on a histogram."""
+    hist = sketch(list(range(1, 101)))["hist"]
+    assert percentile(hist, 10) == 10
+    assert percentile(hist, 50) == 50
+    assert percentile(hist, 90) == 90
+    assert percentile({}, 50) is None
+
+
+def test_merge_equals_combined_samples():
+    """Test that merging daily sketches matches one sketch of all samples."""
+    day1 = sketch([40, 60, 80], state="slouch")
+    day2 = sketch([90, 95])
+    merged = merge([day1, day2])
+    combined = sketch([40, 60, 80, 90, 95])
+
+    assert merged["hist"] == combined["hist"]
+    assert summarize(merged)["p50"] == summarize(combined)["p50"] == 80
+    assert summarize(merged)["time_in_state"] == {"slouch": 15, "aligned": 10}
+
+
+def test_range_distribution():
+    """Test merging the days of a date range."""
+    collection = FakeCollection(
+        [
+            {"_id": "2025-01-01", **sketch([50, 70])},
+            {"_id": "2025-01-02", **sketch([90])},
+            {"_id": "2025-02-01", **sketch([10])},
+        ]
+    )
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc).date()
+    end = datetime(2025, 1, 31, tzinfo=timezone.utc).date()
+
+    result = range_distribution(collection, start, end)
+    assert result["days"] == 2
+    assert result["count"] == 3
+    assert result["avg_score"] == 70
+    assert result["histogram"][9] == 1
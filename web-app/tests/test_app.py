@@ -1,14 +1,21 @@
 """Tests for Flask web app."""
 
+import io
 import pytest
 from unittest.mock import patch, Mock
-from app.app import app
+from bson import ObjectId
+from flask import session
+from app.app import app, current_user
+from admission import AdmissionController
+from cache import profile_cache
+from live import DASHBOARD_CHANNEL
 
 
 @pytest.fixture
 def client():
     """Create a test client for the Flask app."""
     app.config["TESTING"] = True
+    profile_cache.clear()
     with app.test_client() as client:
         yield client
 
@@ -42,3 +49,80 @@ def test_api_status(mock_get, client):
 
     response = client.get("/api/status")
     assert response.status_code == 200
+
+
+@patch("app.app.validate_user")
+def test_login_throttled_before_password_check(mock_validate, client):
+    """Test that an account over its limit gets a 429 without hashing."""
+    mock_validate.return_value = (False, "Invalid email or password.")
+    with patch("app.app.login_ip_limit", AdmissionController(1, 100)), patch(
+        "app.app.login_account_limit", AdmissionController(0.01, 2)
+    ):
+        form = {"username": "a@example.com", "password": "wrong"}
+        assert client.post("/", data=form).status_code == 200
+        assert client.post("/", data=form).status_code == 200
+        response = client.post("/", data=form)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert mock_validate.call_count == 2
+
+
+@patch("app.app.create_user")
+def test_register_throttled_per_ip(mock_create, client):
+    """Test that registration shares the per-IP login limit."""
+    mock_create.return_value = (False, "Email already registered.")
+    form = {
+        "name": "A",
+        "email": "a@example.com",
+        "password": "Passw0rd",
+        "password_confirm": "Passw0rd",
+    }
+    with patch("app.app.login_ip_limit", AdmissionController(0.01, 1)):
+        assert client.post("/register", data=form).status_code == 200
+        response = client.post("/register", data=form)
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert mock_create.call_count == 1
+
+
+@patch("app.app.users")
+def test_current_user_upgrades_legacy_session(mock_users):
+    """Test that an email-only session gains a user id and is cached."""
+    user_id = ObjectId()
+    mock_users.find_one.return_value = {
+        "_id": user_id,
+        "name": "A",
+        "email": "a@example.com",
+        "password": "hash",
+    }
+    profile_cache.clear()
+
+    with app.test_request_context():
+        session["user"] = "a@example.com"
+        profile = current_user()
+        assert session["user_id"] == str(user_id)
+        assert profile["_id"] == str(user_id)
+        assert "password" not in profile
+
+        # Later requests use the cached profile by id
+        assert current_user() == profile
+    assert mock_users.find_one.call_count == 1
+
+
+@patch("app.app.broker")
+@patch("app.app.forward_frame")
+def test_process_publishes_to_every_dashboard(mock_forward, mock_broker, client):
+    """Test that results go to the shared dashboard channel, like the seed."""
+    result = {"state": "good", "score": 90}
+    mock_forward.return_value = (200, result, "")
+
+    with client.session_transaction() as sess:
+        sess["user"] = "a@example.com"
+    response = client.post(
+        "/process", data={"frame": (io.BytesIO(b"jpeg"), "frame.jpg")}
+    )
+
+    assert response.status_code == 200
+    mock_broker.publish.assert_called_once_with(DASHBOARD_CHANNEL, result)
@@ -0,0 +1,29 @@
+"""Tests for the TTL cache."""
+
+from app.cache import TTLCache
+
+
+def test_entries_expire_after_ttl(clock):
+    """Test that cached profiles expire."""
+    cache = TTLCache(ttl=60, maxsize=10, clock=clock)
+    cache.set("user-1", {"name": "A"})
+
+    assert cache.get("user-1") == {"name": "A"}
+    clock.now += 61
+    assert cache.get("user-1") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_and_lru_eviction():
+    """Test explicit invalidation and least-recently-used eviction."""
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
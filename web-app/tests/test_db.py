@@ -2,6 +2,7 @@
 
 from unittest.mock import patch, Mock
 import pytest
+from bson import ObjectId
 
 
 @patch("app.db.MongoClient")
@@ -45,3 +46,21 @@ def test_password_strength():
     # No number
     strong, msg = is_strong_password("Password")
     assert strong is False
+
+
+@patch("app.db.users")
+def test_get_user_profile_cache_hit_skips_mongo(mock_users):
+    """Test that a cached profile is served without a MongoDB lookup."""
+    from app.db import get_user_profile
+    from cache import profile_cache
+
+    profile_cache.clear()
+    user_id = ObjectId()
+    mock_users.find_one.return_value = {"_id": user_id, "name": "A"}
+
+    first = get_user_profile(str(user_id))
+    second = get_user_profile(str(user_id))
+
+    assert first == second == {"_id": str(user_id), "name": "A"}
+    mock_users.find_one.assert_called_once()
+    assert get_user_profile("not-an-id") is None
@@ -0,0 +1,55 @@
+"""Tests for live pub/sub module."""
+
+from app.live import LiveBroker, format_sse, parse_last_event_id
+
+
+def test_publish_fans_out_to_all_tabs():
+    """Test that every subscriber of a user receives the event."""
+    broker = LiveBroker()
+    tab1 = broker.subscribe("a@example.com")
+    tab2 = broker.subscribe("a@example.com")
+    other = broker.subscribe("b@example.com")
+
+    broker.publish("a@example.com", {"score": 80})
+
+    assert tab1.get(timeout=0)[0]["data"] == {"score": 80}
+    assert tab2.get(timeout=0)[0]["data"] == {"score": 80}
+    assert other.get(timeout=0) == []
+
+
+def test_full_queue_drops_oldest():
+    """Test that a slow subscriber keeps only the newest events."""
+    broker = LiveBroker(queue_size=2)
+    sub = broker.subscribe("a@example.com")
+
+    for score in (1, 2, 3):
+        broker.publish("a@example.com", {"score": score})
+
+    events = sub.get(timeout=0)
+    assert [e["data"]["score"] for e in events] == [2, 3]
+    assert sub.dropped == 1
+
+
+def test_stream_heartbeat_and_replay():
+    """Test retry hint, replay after reconnect and heartbeat comments."""
+    broker = LiveBroker()
+    first = broker.publish("a@example.com", {"score": 50})
+    broker.publish("a@example.com", {"score": 60})
+
+    stream = broker.stream("a@example.com", last_event_id=first, heartbeat=0)
+    assert next(stream).startswith("retry:")
+    assert '"score": 60' in next(stream)
+    assert next(stream) == ": heartbeat\n\n"
+
+    stream.close()
+    assert broker.subscriber_count("a@example.com") == 0
+
+
+def test_sse_helpers():
+    """Test SSE formatting and Last-Event-ID parsing."""
+    text = format_sse({"id": 3, "event": "posture", "data": {"score": 1}})
+    assert text == 'id: 3\nevent: posture\ndata: {"score": 1}\n\n'
+
+    assert parse_last_event_id("7") == 7
+    assert parse_last_event_id(None) is None
+    assert parse_last_event_id("abc") is None
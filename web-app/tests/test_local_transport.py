@@ -0,0 +1,114 @@
+"""Tests for the Unix-socket client to a co-located ML client."""
+
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.local_transport import (
+    LocalTransport,
+    TransportError,
+    recv_message,
+    send_message,
+)
+
+
+class EchoHandler(socketserver.BaseRequestHandler):
+    """Answers like the ML client: reports the payload size it received."""
+
+    def handle(self):
+        self.server.connections.append(self.request)
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            self.server.received += 1
+            time.sleep(self.server.delay)
+            timings = "decode=2.0" if header.get("profile") else ""
+            send_message(
+                self.request,
+                {"status": 200, "body": {"size": len(payload)}, "timings": timings},
+            )
+
+
+@pytest.fixture
+def ml_socket(tmp_path):
+    path = str(tmp_path / "ml.sock")
+    server = socketserver.ThreadingUnixStreamServer(path, EchoHandler)
+    server.daemon_threads = True
+    server.connections = []
+    server.received = 0
+    server.delay = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield path, server
+    server.shutdown()
+    server.server_close()
+
+
+def test_unavailable_without_socket(tmp_path):
+    """Test that HTTP is used when no socket is configured or present."""
+    assert not LocalTransport(path="").available()
+    assert not LocalTransport(path=str(tmp_path / "missing.sock")).available()
+
+
+def test_process_round_trip(ml_socket):
+    """Test that frames and timings travel over the socket."""
+    path, _ = ml_socket
+    transport = LocalTransport(path=path)
+    assert transport.available()
+
+    assert transport.process(b"x" * 1000) == (200, {"size": 1000}, "")
+    assert transport.process(b"abc", profile=True) == (
+        200,
+        {"size": 3},
+        "decode=2.0",
+    )
+
+
+def test_connections_are_reused_across_threads(ml_socket):
+    """Test that request threads share pooled connections."""
+    path, server = ml_socket
+    transport = LocalTransport(path=path)
+
+    for _ in range(3):
+        worker = threading.Thread(target=transport.process, args=(b"frame",))
+        worker.start()
+        worker.join()
+
+    assert server.received == 3
+    assert len(server.connections) == 1
+
+
+def test_failure_marks_transport_down(ml_socket, tmp_path):
+    """Test that a dead socket raises and backs off so callers use HTTP."""
+    path, server = ml_socket
+    transport = LocalTransport(path=path, retry_after=30)
+    transport.process(b"frame")
+
+    # Simulate an ML client crash: open connections drop, the socket
+    # file stays behind and nothing accepts new connections
+    server.shutdown()
+    server.server_close()
+    for conn in server.connections:
+        conn.shutdown(socket.SHUT_RDWR)
+
+    with pytest.raises(TransportError):
+        transport.process(b"frame")
+    assert not transport.available()
+
+
+def test_slow_response_is_not_resent(ml_socket):
+    """Test that a timeout after sending returns 503 without a second copy."""
+    path, server = ml_socket
+    transport = LocalTransport(path=path, timeout=0.2)
+    transport.process(b"warm up")
+    server.delay = 0.5
+
+    status, body, _ = transport.process(b"frame")
+    assert status == 503
+    assert "error" in body
+    assert server.received == 2
+    assert not transport.available()
@@ -0,0 +1,95 @@
+"""Tests for ML backend pool."""
+
+from unittest.mock import Mock, patch
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from app.ml_pool import MLPool, OVERLOAD_MARGIN
+
+URLS = ["http://ml-1:5002", "http://ml-2:5002", "http://ml-3:5002"]
+
+
+def make_pool():
+    return MLPool(URLS, health_interval=0)
+
+
+def test_session_affinity_is_stable():
+    """Test that the same tracking session always hits the same node."""
+    pool = make_pool()
+    first = pool.pick("session-a")
+    assert all(pool.pick("session-a") is first for _ in range(10))
+
+    owners = {pool.pick(f"session-{i}").url for i in range(200)}
+    assert owners == set(URLS)
+
+
+def test_overloaded_home_falls_back_to_least_outstanding():
+    """Test least-outstanding fallback when the home node is busy."""
+    pool = make_pool()
+    home = pool.pick("session-a")
+    home.outstanding = OVERLOAD_MARGIN
+
+    assert pool.pick("session-a") is not home
+
+
+def test_draining_node_leaves_after_in_flight_requests():
+    """Test that a removed node finishes its requests before leaving."""
+    pool = make_pool()
+    backend = pool.pick("session-a")
+
+    with pool.track(backend):
+        pool.set_members([u for u in URLS if u != backend.url])
+        assert pool.pick("session-a") is not backend
+        assert backend.url in [b["url"] for b in pool.snapshot()]
+
+    assert backend.url not in [b["url"] for b in pool.snapshot()]
+
+
+@patch("app.ml_pool.requests.get")
+def test_health_checks_remove_failing_node(mock_get):
+    """Test that a node failing /health stops receiving sessions."""
+    pool = make_pool()
+
+    def health(url, timeout):
+        if url.startswith(URLS[0]):
+            raise requests.exceptions.ConnectionError()
+        return Mock(status_code=200)
+
+    mock_get.side_effect = health
+    pool.check_health()
+    pool.check_health()
+
+    assert all(pool.pick(f"session-{i}").url != URLS[0] for i in range(50))
+
+
+@patch("app.ml_pool.requests.post")
+def test_post_frame_retries_on_another_node(mock_post):
+    """Test that an unreachable node is skipped for the retry."""
+    pool = make_pool()
+    ok = Mock(status_code=200)
+    refused = MaxRetryError(None, "/process", NewConnectionError(None, "refused"))
+    mock_post.side_effect = [requests.exceptions.ConnectionError(refused), ok]
+
+    assert pool.post_frame("session-a", {"frame": Mock()}) is ok
+    first_url = mock_post.call_args_list[0][0][0]
+    second_url = mock_post.call_args_list[1][0][0]
+    assert first_url != second_url
+
+
+def test_is_multi_node():
+    """Test that the Unix-socket shortcut is only allowed with one node."""
+    assert make_pool().is_multi_node()
+    assert not MLPool(URLS[:1], health_interval=0).is_multi_node()
+
+
+@patch("app.ml_pool.requests.post")
+def test_post_frame_does_not_resend_after_disconnect(mock_post):
+    """Test that a connection dropped mid-request is not retried."""
+    pool = make_pool()
+    mock_post.side_effect = requests.exceptions.ConnectionError(
+        "Connection aborted.", "RemoteDisconnected"
+    )
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        pool.post_frame("session-a", {"frame": Mock()})
+    assert mock_post.call_count == 1